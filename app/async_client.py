@@ -0,0 +1,180 @@
+import asyncio
+
+import httpx
+
+from app import catalog
+from app.cocktails import (
+    BASE_URL, YOUTUBE_SEARCH_URL, ENDPOINT_TIMEOUTS, CACHE_TTLS, NEGATIVE_CACHE_TTL,
+    COCKTAILDB_LIMITER, YOUTUBE_LIMITER, catalog_cache, MixerMatcher, build_recommendation, sort_recommendations,
+    load_drinks_by_alcohol, load_local_drink, load_drink, load_ingredient_list,
+    youtube_search, youtube_search_params, youtube_video_result, parse_youtube_response, youtube_error_result,
+    get_cached_youtube_tutorial, cache_youtube_tutorial,
+)
+from app.drink import Drink
+from app.http_client import DEFAULT_TIMEOUT, MAX_RETRIES, POOL_SIZE, UpstreamError, classify_response, retry_delay
+
+# Async versions of the upstream client and fetch functions in app/cocktails.py.
+# They share the same cache, catalog, rate limiter and error classification. The
+# gain is concurrency inside one request: a page's lookups run on one event loop
+# instead of a thread pool. Flask still runs each async view on a worker thread,
+# so this doesn't reduce the threads needed per request.
+#
+# An httpx.AsyncClient belongs to the event loop it was created on, so callers
+# open one per request with create_client() and pass it to every call.
+
+MAX_CONCURRENT_REQUESTS = 16
+
+
+def create_client():
+    limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+    return httpx.AsyncClient(limits=limits)
+
+
+def classify_exception(exc):
+    if isinstance(exc, httpx.TimeoutException):
+        return UpstreamError("timeout", f"Timeout: {exc}")
+    return UpstreamError("network", f"Network error: {exc}")
+
+
+async def get_json_async(client, url, params=None, timeout=DEFAULT_TIMEOUT, limiter=None, retries=MAX_RETRIES):
+    """Async get_json(): same retries, backoff and UpstreamError kinds."""
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            # The shared limiter is a SQLite transaction: keep it off the event loop
+            wait = await asyncio.to_thread(limiter.reserve)
+            if wait > 0:
+                await asyncio.sleep(wait)
+        try:
+            response = await client.get(url, params=params, timeout=timeout)
+        except httpx.HTTPError as e:
+            error = classify_exception(e)
+        else:
+            error = classify_response(response)
+            if error is None:
+                try:
+                    return response.json()
+                except ValueError:
+                    raise UpstreamError("bad_response", "API returned invalid JSON", response.status_code)
+
+        if not error.retryable or attempt == retries:
+            raise error
+        await asyncio.sleep(retry_delay(attempt, error.retry_after))
+
+
+async def get_or_load_async(key, load, reload, ttl, stale_ttl=0, negative_ttl=None):
+    # catalog_cache.get_or_load() with an async loader. Stale entries are served
+    # and refreshed in the background with the sync `reload`, since the request's
+    # event loop is gone once the view returns.
+    found, value = catalog_cache.lookup(key, reload, ttl, stale_ttl, negative_ttl)
+    if found:
+        return value
+    value = await load()
+    catalog_cache.store(key, value, ttl, stale_ttl, negative_ttl)
+    return value
+
+
+async def fetch_drinks_by_alcohol_async(client, alcohol):
+    async def load():
+        if catalog.is_populated():
+            return catalog.get_drinks_by_ingredient(alcohol)
+        data = await get_json_async(client, f"{BASE_URL}/filter.php", params={"i": alcohol}, timeout=ENDPOINT_TIMEOUTS["filter.php"], limiter=COCKTAILDB_LIMITER)
+        drinks = data.get("drinks")
+        return drinks if isinstance(drinks, list) else []
+
+    ttl, stale_ttl = CACHE_TTLS["filter.php"]
+    try:
+        return await get_or_load_async(("filter.php", alcohol.strip().lower()), load, lambda: load_drinks_by_alcohol(alcohol), ttl, stale_ttl, NEGATIVE_CACHE_TTL)
+    except UpstreamError as e:
+        print(f"Error fetching drinks for {alcohol}: {e}")
+        return []
+
+
+async def fetch_drink_async(client, drink_id):
+    async def load():
+        drink = load_local_drink(drink_id)
+        if drink:
+            return drink
+        data = await get_json_async(client, f"{BASE_URL}/lookup.php", params={"i": drink_id}, timeout=ENDPOINT_TIMEOUTS["lookup.php"], limiter=COCKTAILDB_LIMITER)
+        drinks = data.get("drinks")
+        detail = drinks[0] if drinks and isinstance(drinks, list) else None
+        return Drink.from_api(detail) if detail else None
+
+    ttl, stale_ttl = CACHE_TTLS["lookup.php"]
+    try:
+        drink = await get_or_load_async(("lookup.php", str(drink_id)), load, lambda: load_drink(drink_id), ttl, stale_ttl, NEGATIVE_CACHE_TTL)
+    except UpstreamError as e:
+        print(f"Error fetching details for drink_id {drink_id} ({e.kind}): {e}")
+        return None
+    if not drink:
+        print(f"No drink details found for drink_id {drink_id}")
+    return drink
+
+
+async def fetch_ingredient_list_async(client):
+    async def load():
+        if catalog.is_populated():
+            ingredients = catalog.get_ingredient_list()
+            if ingredients:
+                return ingredients
+        data = await get_json_async(client, f"{BASE_URL}/list.php", params={"i": "list"}, timeout=ENDPOINT_TIMEOUTS["list.php"], limiter=COCKTAILDB_LIMITER)
+        return sorted(d["strIngredient1"].strip() for d in data.get("drinks") or [] if d.get("strIngredient1"))
+
+    ttl, stale_ttl = CACHE_TTLS["list.php"]
+    try:
+        return await get_or_load_async(("list.php",), load, load_ingredient_list, ttl, stale_ttl)
+    except UpstreamError as e:
+        print(f"Error fetching ingredient list: {e}")
+        return []
+
+
+async def fetch_drinks_many_async(client, drink_ids):
+    # Same order as drink_ids, at most MAX_CONCURRENT_REQUESTS lookups in flight
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def fetch(drink_id):
+        async with semaphore:
+            return await fetch_drink_async(client, drink_id)
+
+    return await asyncio.gather(*(fetch(drink_id) for drink_id in drink_ids))
+
+
+async def search_youtube_tutorial_async(client, cocktail_name):
+    search_query, api_key = youtube_search(cocktail_name)
+    if not api_key:
+        return youtube_video_result(search_query, api_key_missing=True)
+    try:
+        data = await get_json_async(client, YOUTUBE_SEARCH_URL, params=youtube_search_params(search_query, api_key), timeout=ENDPOINT_TIMEOUTS["youtube"], limiter=YOUTUBE_LIMITER)
+        return parse_youtube_response(search_query, data)
+    except UpstreamError as e:
+        return youtube_error_result(cocktail_name, search_query, e)
+
+
+async def fetch_youtube_tutorial_async(client, cocktail_name):
+    # Async fetch_youtube_tutorial: same persistent cache and caching rules
+    cached = get_cached_youtube_tutorial(cocktail_name)
+    if cached is not None:
+        return cached
+    result = await search_youtube_tutorial_async(client, cocktail_name)
+    cache_youtube_tutorial(cocktail_name, result)
+    return result
+
+
+async def recommend_cocktails_async(client, user_prefs, max_results=50):
+    # Lightweight results like the cached searches in app/recommendations.py
+    # (every match, best first, when max_results is None)
+    alcohols = user_prefs["alcohol_types"]
+    drink_lists = await asyncio.gather(*(fetch_drinks_by_alcohol_async(client, alc) for alc in alcohols))
+
+    seen = set()
+    drink_ids = []
+    for drinks in drink_lists:
+        # Limit drinks per alcohol to avoid too many API calls
+        for d in drinks[:20]:
+            if isinstance(d, dict) and "idDrink" in d and d["idDrink"] not in seen:
+                seen.add(d["idDrink"])
+                drink_ids.append(d["idDrink"])
+
+    matcher = MixerMatcher(user_prefs["mixers"])
+    drinks = await fetch_drinks_many_async(client, drink_ids)
+    results = [build_recommendation(drink_id, drink, matcher) for drink_id, drink in zip(drink_ids, drinks)]
+    return sort_recommendations([r for r in results if r], max_results)
@@ -0,0 +1,113 @@
+import threading
+from bisect import bisect_left
+
+from app import catalog
+from app.cocktails import fetch_ingredient_list
+
+# Ingredient autocomplete for the home page, so it doesn't have to ship the
+# whole ingredient list (twice) on every visit.
+#
+# Matches are ranked in tiers: names starting with the query, then names with
+# a word starting with it ("juice" -> "Lime Juice"), then close misspellings
+# found through shared trigrams ("tequlia" -> "Tequila"). Within a tier the
+# ingredients used by the most catalog drinks come first.
+
+MIN_TYPO_SIMILARITY = 0.3
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IngredientIndex:
+
+    def __init__(self, names, popularity=None):
+        popularity = popularity or {}
+        by_key = {}
+        for name in names:
+            if name and name.strip():
+                by_key.setdefault(name.strip().lower(), name.strip())
+        self.keys = list(by_key)
+        self.names = list(by_key.values())
+        self.popularity = [popularity.get(key, 0) for key in self.keys]
+
+        # Sorted (prefix, index) lists for binary search: whole names and each later word
+        self.prefixes = sorted((key, i) for i, key in enumerate(self.keys))
+        self.word_prefixes = sorted((word, i) for i, key in enumerate(self.keys) for word in key.split()[1:])
+
+        self.trigram_index = {}
+        self.trigram_counts = []
+        for i, key in enumerate(self.keys):
+            grams = trigrams(key)
+            self.trigram_counts.append(len(grams))
+            for gram in grams:
+                self.trigram_index.setdefault(gram, []).append(i)
+
+        # Default suggestions for an empty query
+        self.by_popularity = sorted(range(len(self.names)), key=lambda i: (-self.popularity[i], self.keys[i]))
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefix_matches(self, entries, query):
+        start = bisect_left(entries, (query,))
+        matches = []
+        for key, i in entries[start:]:
+            if not key.startswith(query):
+                break
+            matches.append(i)
+        return matches
+
+    def _typo_matches(self, query):
+        # Dice similarity over trigrams, only for names sharing at least one trigram
+        grams = trigrams(query)
+        shared = {}
+        for gram in grams:
+            for i in self.trigram_index.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        scored = []
+        for i, count in shared.items():
+            similarity = 2 * count / (len(grams) + self.trigram_counts[i])
+            if similarity >= MIN_TYPO_SIMILARITY:
+                scored.append((similarity, i))
+        return [i for _, i in sorted(scored, key=lambda s: (-s[0], -self.popularity[s[1]], self.keys[s[1]]))]
+
+    def search(self, query, limit=10):
+        """Up to `limit` [(name, popularity), ...] for what the user has typed so far."""
+        query = " ".join(query.lower().split())
+        if not query:
+            ranked = self.by_popularity
+        else:
+            by_rank = lambda matches: sorted(matches, key=lambda i: (-self.popularity[i], self.keys[i]))
+            ranked = by_rank(self._prefix_matches(self.prefixes, query))
+            ranked += by_rank(self._prefix_matches(self.word_prefixes, query))
+            if len(ranked) < limit:
+                ranked += self._typo_matches(query)
+
+        results = []
+        seen = set()
+        for i in ranked:
+            if i not in seen:
+                seen.add(i)
+                results.append((self.names[i], self.popularity[i]))
+                if len(results) >= limit:
+                    break
+        return results
+
+
+_index = None
+_index_source = None
+_index_lock = threading.Lock()
+
+
+def get_ingredient_index():
+    # Rebuilt when the ingredient list or the catalog changes
+    global _index, _index_source
+    names = fetch_ingredient_list()
+    source = (tuple(names), catalog.get_meta("last_synced_at") if catalog.catalog_exists() else None)
+    with _index_lock:
+        if _index is None or _index_source != source:
+            _index = IngredientIndex(names, catalog.get_ingredient_popularity())
+            _index_source = source
+        return _index
@@ -0,0 +1,354 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+
+class CacheEntry:
+    __slots__ = ("value", "expires_at", "stale_until")
+
+    def __init__(self, value, expires_at, stale_until):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    # Size-bounded LRU cache where every entry has its own TTL.
+    #
+    # Between expires_at and stale_until an entry is "stale": it is still served,
+    # but a background thread reloads it so the next caller gets a fresh value.
+    # Loaders that return None (or an empty list) are cached as negative entries
+    # with their own, usually shorter, TTL. Loaders that raise are never cached.
+
+    def __init__(self, maxsize=1024, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.refreshing = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _entry(self, key):
+        # Takes self.lock itself, so subclasses can read their storage without holding it
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def get(self, key, default=None, allow_stale=False):
+        entry = self._entry(key)
+        if entry is None or self.clock() >= (entry.stale_until if allow_stale else entry.expires_at):
+            return default
+        return entry.value
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        now = self.clock()
+        with self.lock:
+            self.entries[key] = CacheEntry(value, now + ttl, now + ttl + stale_ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def lookup(self, key, loader, ttl, stale_ttl=0, negative_ttl=None):
+        """Return (found, value) for key, counting the hit or miss.
+
+        A stale entry is returned as found and reloaded with loader() in a
+        background thread. On a miss the caller loads the value and store()s it.
+        """
+        now = self.clock()
+        entry = self._entry(key)
+        with self.lock:
+            if entry is not None and now < entry.stale_until:
+                if is_negative(entry.value):
+                    self.negative_hits += 1
+                if now < entry.expires_at:
+                    self.hits += 1
+                    return True, entry.value
+                self.stale_hits += 1
+                if key not in self.refreshing:
+                    self.refreshing.add(key)
+                    refresh = True
+                else:
+                    refresh = False
+            else:
+                self.misses += 1
+                return False, None
+
+        if refresh:
+            thread = threading.Thread(target=self._refresh, args=(key, loader, ttl, stale_ttl, negative_ttl), daemon=True)
+            thread.start()
+        return True, entry.value
+
+    def get_or_load(self, key, loader, ttl, stale_ttl=0, negative_ttl=None):
+        found, value = self.lookup(key, loader, ttl, stale_ttl, negative_ttl)
+        if found:
+            return value
+        value = loader()
+        self.store(key, value, ttl, stale_ttl, negative_ttl)
+        return value
+
+    def store(self, key, value, ttl, stale_ttl, negative_ttl):
+        if is_negative(value):
+            if negative_ttl:
+                self.set(key, value, negative_ttl)
+            else:
+                self.delete(key)
+        else:
+            self.set(key, value, ttl, stale_ttl)
+
+    def _refresh(self, key, loader, ttl, stale_ttl, negative_ttl):
+        try:
+            self.store(key, loader(), ttl, stale_ttl, negative_ttl)
+        except Exception as e:
+            # Keep serving the stale value; the next stale hit will try again
+            self.refresh_errors += 1
+            print(f"Background refresh failed for {key}: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refresh_errors": self.refresh_errors,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+
+class SingleFlight:
+    # Coalesces concurrent calls for the same key: the first caller (the leader)
+    # does the work and everyone who asks for that key meanwhile waits for its result.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def claim(self, key):
+        """Return (future, is_leader). The leader must call finish() for the key."""
+        with self.lock:
+            future = self.calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self.calls[key] = Future()
+            return future, True
+
+    def finish(self, key, result=None, error=None):
+        with self.lock:
+            future = self.calls.pop(key, None)
+        if future is None:
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, timeout=None):
+        # Waiters give up on the leader after `timeout` seconds and call fn themselves
+        future, is_leader = self.claim(key)
+        if not is_leader:
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                self.timeouts += 1
+                print(f"Gave up waiting on the in-flight call for {key}, running it here")
+                return fn()
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+
+def is_negative(value):
+    return value is None or value == []
+
+
+DEFAULT_SQLITE_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "cache.db")
+
+
+class SQLiteCache:
+    # Persistent key/value cache in a local SQLite file, shared by every worker
+    # process on the host and kept across restarts. Values are stored as JSON.
+    # WAL mode lets readers carry on while another process writes.
+
+    def __init__(self, namespace, path=None):
+        self.namespace = namespace
+        self.path = path
+        self.local = threading.local()
+
+    def get_path(self):
+        return self.path or os.environ.get("CACHE_DB_PATH") or DEFAULT_SQLITE_CACHE_PATH
+
+    def connection(self):
+        path = self.get_path()
+        connections = getattr(self.local, "connections", None)
+        if connections is None:
+            connections = self.local.connections = {}
+        conn = connections.get(path)
+        if conn is None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            connections[path] = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self.connection().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            return default
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), time.time() + ttl),
+            )
+
+    def delete(self, key):
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self):
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def purge_expired(self):
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time()))
+
+    def count(self):
+        row = self.connection().execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()
+        return row[0]
+
+
+class SharedTTLCache(TTLCache):
+    # TTLCache whose entries live in a SQLiteCache file instead of this process,
+    # so every worker on the host shares one warm copy (and one upstream fetch).
+    # Expiry uses wall-clock time since it is compared across processes.
+    # encode/decode convert values to and from JSON-compatible data.
+
+    # Expired rows are cleaned up every this many writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, namespace, path=None, encode=None, decode=None):
+        super().__init__(maxsize=None, clock=time.time)
+        self.backend = SQLiteCache(namespace, path)
+        self.encode = encode or (lambda value: value)
+        self.decode = decode or (lambda value: value)
+        self.writes = 0
+        self.backend_errors = 0
+
+    # A cache file that can't be used (locked, unwritable or corrupt) degrades to
+    # misses and skipped writes rather than failing the request; backend_errors counts them.
+
+    def __len__(self):
+        try:
+            return self.backend.count()
+        except (sqlite3.Error, OSError):
+            return 0
+
+    def _backend_error(self, action, e):
+        self.backend_errors += 1
+        print(f"Shared cache {self.backend.namespace} couldn't {action} ({e}), skipping it")
+
+    def _entry(self, key):
+        # No lock: SQLite does its own locking, and other threads shouldn't wait on this I/O
+        try:
+            envelope = self.backend.get(json.dumps(key))
+        except (sqlite3.Error, OSError, ValueError) as e:
+            self._backend_error("read", e)
+            return None
+        if envelope is None:
+            return None
+        value, expires_at, stale_until = envelope
+        return CacheEntry(self.decode(value), expires_at, stale_until)
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        now = self.clock()
+        envelope = [self.encode(value), now + ttl, now + ttl + stale_ttl]
+        try:
+            self.backend.set(json.dumps(key), envelope, ttl + stale_ttl)
+            self.writes += 1
+            if self.writes % self.PURGE_EVERY == 0:
+                self.backend.purge_expired()
+        except (sqlite3.Error, OSError) as e:
+            self._backend_error("write", e)
+
+    def delete(self, key):
+        try:
+            self.backend.delete(json.dumps(key))
+        except (sqlite3.Error, OSError) as e:
+            self._backend_error("delete", e)
+
+    def clear(self):
+        try:
+            self.backend.clear()
+        except (sqlite3.Error, OSError) as e:
+            self._backend_error("clear", e)
+
+    def stats(self):
+        stats = super().stats()
+        stats["backend_errors"] = self.backend_errors
+        return stats
+
+
+CACHE_BACKENDS = ("memory", "sqlite")
+
+
+def create_cache(namespace, maxsize=1024, encode=None, decode=None, backend=None):
+    # CACHE_BACKEND=sqlite shares the cache between worker processes (in CACHE_DB_PATH);
+    # the default keeps it in this process's memory
+    backend = backend or os.environ.get("CACHE_BACKEND", "memory")
+    if backend == "sqlite":
+        return SharedTTLCache(namespace, encode=encode, decode=decode)
+    if backend != "memory":
+        print(f"Unknown CACHE_BACKEND {backend!r}, using memory (expected one of {CACHE_BACKENDS})")
+    return TTLCache(maxsize=maxsize)
@@ -0,0 +1,397 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Local mirror of TheCocktailDB so page views don't have to go upstream.
+# Populate / refresh it with:  python -m app.catalog
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "catalog.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drinks (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    thumb TEXT,
+    raw_json TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ingredients (
+    name TEXT PRIMARY KEY,
+    name_key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS drink_ingredients (
+    drink_id TEXT NOT NULL REFERENCES drinks(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    ingredient TEXT NOT NULL,
+    ingredient_key TEXT NOT NULL,
+    measure TEXT,
+    PRIMARY KEY (drink_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_drink_ingredients_key ON drink_ingredients(ingredient_key);
+CREATE TABLE IF NOT EXISTS ingredient_cooccurrence (
+    ingredient_key TEXT NOT NULL,
+    other_key TEXT NOT NULL,
+    drink_count INTEGER NOT NULL,
+    PRIMARY KEY (ingredient_key, other_key)
+);
+CREATE TABLE IF NOT EXISTS drink_similarity (
+    drink_id TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    similar_id TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (drink_id, rank)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_local = threading.local()
+
+
+def get_db_path():
+    return os.environ.get("CATALOG_DB_PATH") or DEFAULT_DB_PATH
+
+
+def get_connection(db_path=None):
+    # One connection per thread per database file (sqlite connections can't be shared across threads)
+    db_path = db_path or get_db_path()
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.executescript(SCHEMA)
+        connections[db_path] = conn
+    return conn
+
+
+def close_connections():
+    connections = getattr(_local, "connections", None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+
+def catalog_exists(db_path=None):
+    return os.path.exists(db_path or get_db_path())
+
+
+def is_populated(db_path=None):
+    # Only trust the catalog for "not found" answers once a full sync has completed
+    if not catalog_exists(db_path):
+        return False
+    return get_meta("last_synced_at", db_path) is not None
+
+
+def get_meta(key, db_path=None):
+    row = get_connection(db_path).execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else None
+
+
+def set_meta(key, value, db_path=None):
+    conn = get_connection(db_path)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def save_drink(detail, db_path=None, conn=None):
+    drink_id = str(detail["idDrink"])
+    conn = conn or get_connection(db_path)
+    conn.execute(
+        "INSERT OR REPLACE INTO drinks (id, name, thumb, raw_json, updated_at) VALUES (?, ?, ?, ?, ?)",
+        (drink_id, detail.get("strDrink") or "", detail.get("strDrinkThumb"), json.dumps(detail), time.time()),
+    )
+    conn.execute("DELETE FROM drink_ingredients WHERE drink_id = ?", (drink_id,))
+    for n in range(1, 16):
+        ing = detail.get(f"strIngredient{n}")
+        measure = detail.get(f"strMeasure{n}")
+        if ing and ing.strip():
+            ing_clean = ing.strip()
+            conn.execute(
+                "INSERT INTO drink_ingredients (drink_id, position, ingredient, ingredient_key, measure) VALUES (?, ?, ?, ?, ?)",
+                (drink_id, n, ing_clean, ing_clean.lower(), (measure or "").strip()),
+            )
+
+
+def save_drinks(details, db_path=None):
+    conn = get_connection(db_path)
+    with conn:
+        for detail in details:
+            save_drink(detail, conn=conn)
+
+
+def save_ingredients(names, db_path=None):
+    conn = get_connection(db_path)
+    with conn:
+        for name in names:
+            conn.execute(
+                "INSERT OR REPLACE INTO ingredients (name, name_key) VALUES (?, ?)",
+                (name, name.lower()),
+            )
+
+
+def get_drink(drink_id, db_path=None):
+    if not catalog_exists(db_path):
+        return None
+    row = get_connection(db_path).execute("SELECT raw_json FROM drinks WHERE id = ?", (str(drink_id),)).fetchone()
+    if not row:
+        return None
+    return json.loads(row["raw_json"])
+
+
+def get_drinks_by_ingredient(ingredient, db_path=None):
+    # Same shape as the filter.php response: [{"strDrink", "strDrinkThumb", "idDrink"}, ...]
+    if not catalog_exists(db_path):
+        return []
+    rows = get_connection(db_path).execute(
+        """
+        SELECT DISTINCT d.id, d.name, d.thumb
+        FROM drink_ingredients di JOIN drinks d ON d.id = di.drink_id
+        WHERE di.ingredient_key = ?
+        ORDER BY d.name
+        """,
+        (ingredient.strip().lower(),),
+    ).fetchall()
+    return [{"strDrink": row["name"], "strDrinkThumb": row["thumb"], "idDrink": row["id"]} for row in rows]
+
+
+def get_ingredient_list(db_path=None):
+    if not catalog_exists(db_path):
+        return []
+    rows = get_connection(db_path).execute("SELECT name FROM ingredients ORDER BY name").fetchall()
+    return [row["name"] for row in rows]
+
+
+def get_ingredient_popularity(db_path=None):
+    # {ingredient_key: number of drinks using it}
+    if not catalog_exists(db_path):
+        return {}
+    rows = get_connection(db_path).execute(
+        "SELECT ingredient_key, COUNT(DISTINCT drink_id) AS drink_count FROM drink_ingredients GROUP BY ingredient_key"
+    ).fetchall()
+    return {row["ingredient_key"]: row["drink_count"] for row in rows}
+
+
+def get_all_drink_ids(db_path=None):
+    if not catalog_exists(db_path):
+        return []
+    rows = get_connection(db_path).execute("SELECT id FROM drinks ORDER BY id").fetchall()
+    return [row["id"] for row in rows]
+
+
+def get_drink_ingredient_keys(db_path=None):
+    # {drink_id: (name, thumb, [ingredient_key, ...])} for the whole catalog in one query
+    if not catalog_exists(db_path):
+        return {}
+    rows = get_connection(db_path).execute(
+        """
+        SELECT d.id, d.name, d.thumb, di.ingredient_key
+        FROM drinks d LEFT JOIN drink_ingredients di ON di.drink_id = d.id
+        ORDER BY d.id, di.position
+        """
+    ).fetchall()
+    drinks = {}
+    for row in rows:
+        entry = drinks.get(row["id"])
+        if entry is None:
+            entry = drinks[row["id"]] = (row["name"], row["thumb"], [])
+        if row["ingredient_key"]:
+            entry[2].append(row["ingredient_key"])
+    return drinks
+
+
+def get_snapshot(db_path=None):
+    # The mmapped snapshot of this catalog (see app/snapshot.py), or None if
+    # there isn't one written from the latest sync
+    from app.snapshot import get_current_snapshot
+
+    if not catalog_exists(db_path):
+        return None
+    return get_current_snapshot(get_meta("last_synced_at", db_path))
+
+
+def get_all_drinks(db_path=None):
+    # Every drink in the catalog as a Drink, ordered by id
+    from app.drink import Drink
+
+    if not catalog_exists(db_path):
+        return []
+    rows = get_connection(db_path).execute("SELECT raw_json FROM drinks ORDER BY id").fetchall()
+    return [Drink.from_api(json.loads(row["raw_json"])) for row in rows]
+
+
+def write_catalog_snapshot(db_path=None, path=None):
+    from app.snapshot import write_snapshot
+
+    ounces = parse_catalog_measures(db_path)
+    return write_snapshot(get_all_drinks(db_path), get_meta("last_synced_at", db_path), path, ounces)
+
+
+def parse_catalog_measures(db_path=None):
+    # Parse every distinct measure in the catalog in one pass: {measure_text: ounces}
+    from app.measures import parse_measures
+
+    if not catalog_exists(db_path):
+        return {}
+    rows = get_connection(db_path).execute("SELECT DISTINCT measure FROM drink_ingredients WHERE measure != ''").fetchall()
+    return parse_measures(row["measure"] for row in rows)
+
+
+def build_cooccurrence_index(db_path=None):
+    # For every ingredient, count how many drinks each other ingredient appears in alongside it
+    conn = get_connection(db_path)
+    with conn:
+        conn.execute("DELETE FROM ingredient_cooccurrence")
+        conn.execute(
+            """
+            INSERT INTO ingredient_cooccurrence (ingredient_key, other_key, drink_count)
+            SELECT a.ingredient_key, b.ingredient_key, COUNT(DISTINCT a.drink_id)
+            FROM drink_ingredients a JOIN drink_ingredients b
+                ON a.drink_id = b.drink_id AND a.ingredient_key != b.ingredient_key
+            GROUP BY a.ingredient_key, b.ingredient_key
+            """
+        )
+    count = conn.execute("SELECT COUNT(*) FROM ingredient_cooccurrence").fetchone()[0]
+    set_meta("cooccurrence_built_at", str(time.time()), db_path)
+    return count
+
+
+def get_cooccurring_ingredients(ingredient_keys, exclude=(), db_path=None):
+    # [(other_ingredient_key, drink_count), ...] ranked by how many drinks use them with
+    # any of ingredient_keys. A drink with several of the keys still counts once.
+    keys = sorted({k.strip().lower() for k in ingredient_keys if k.strip()})
+    if not keys or not catalog_exists(db_path):
+        return []
+    excluded = set(keys) | {e.lower() for e in exclude}
+    if len(keys) == 1:
+        # Precomputed by build_cooccurrence_index
+        query = """
+            SELECT other_key, drink_count
+            FROM ingredient_cooccurrence
+            WHERE ingredient_key = ?
+            ORDER BY drink_count DESC, other_key
+        """
+    else:
+        # Summing the per-key counts would count a drink once per key it contains
+        placeholders = ",".join("?" for _ in keys)
+        query = f"""
+            SELECT b.ingredient_key AS other_key, COUNT(DISTINCT a.drink_id) AS drink_count
+            FROM drink_ingredients a JOIN drink_ingredients b
+                ON a.drink_id = b.drink_id AND a.ingredient_key != b.ingredient_key
+            WHERE a.ingredient_key IN ({placeholders})
+            GROUP BY b.ingredient_key
+            ORDER BY drink_count DESC, other_key
+        """
+    rows = get_connection(db_path).execute(query, keys).fetchall()
+    return [(row["other_key"], row["drink_count"]) for row in rows if row["other_key"] not in excluded]
+
+
+def has_cooccurrence_index(db_path=None):
+    return is_populated(db_path) and get_meta("cooccurrence_built_at", db_path) is not None
+
+
+def save_similar_drinks(neighbours, db_path=None):
+    # neighbours: {drink_id: [(similar_id, score), ...] best first}; replaces the whole index
+    conn = get_connection(db_path)
+    with conn:
+        conn.execute("DELETE FROM drink_similarity")
+        conn.executemany(
+            "INSERT INTO drink_similarity (drink_id, rank, similar_id, score) VALUES (?, ?, ?, ?)",
+            [(drink_id, rank, similar_id, score) for drink_id, similar in neighbours.items() for rank, (similar_id, score) in enumerate(similar)],
+        )
+    set_meta("similarity_built_at", str(time.time()), db_path)
+
+
+def get_similar_drinks(drink_id, limit=6, db_path=None):
+    # [{"id", "name", "thumb", "score"}, ...] from the precomputed similarity index
+    if not catalog_exists(db_path):
+        return []
+    rows = get_connection(db_path).execute(
+        """
+        SELECT s.similar_id, d.name, d.thumb, s.score
+        FROM drink_similarity s JOIN drinks d ON d.id = s.similar_id
+        WHERE s.drink_id = ? AND s.rank < ?
+        ORDER BY s.rank
+        """,
+        (str(drink_id), limit),
+    ).fetchall()
+    return [{"id": row["similar_id"], "name": row["name"], "thumb": row["thumb"], "score": row["score"]} for row in rows]
+
+
+# search.php?f=<letter> returns full records, so the whole catalog takes one call per letter
+FIRST_LETTERS = "abcdefghijklmnopqrstuvwxyz0123456789"
+SWEEP_WORKERS = 4
+
+
+def sweep_catalog(refresh=False, db_path=None, max_workers=SWEEP_WORKERS):
+    # Download every drink with one search per first letter, a few letters at a
+    # time (the shared rate limiter still applies). Finished letters are recorded
+    # in meta, so an interrupted sweep picks up where it stopped unless refresh=True.
+    # Returns (drinks_saved, letters_failed).
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from app.cocktails import request_drinks_by_first_letter
+    from app.http_client import UpstreamError
+
+    done = set() if refresh else set(get_meta("sweep_letters_done", db_path) or "")
+    letters = [letter for letter in FIRST_LETTERS if letter not in done]
+
+    saved = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(request_drinks_by_first_letter, letter): letter for letter in letters}
+        for future in as_completed(futures):
+            letter = futures[future]
+            try:
+                details = future.result()
+            except UpstreamError as e:
+                print(f"Error fetching drinks starting with {letter!r}: {e}")
+                failed.append(letter)
+                continue
+            # Written from this thread only, since connections are per thread
+            save_drinks(details, db_path)
+            saved += len(details)
+            done.add(letter)
+            set_meta("sweep_letters_done", "".join(sorted(done)), db_path)
+
+    if not failed:
+        # Sweep complete: the next one starts from scratch
+        set_meta("sweep_letters_done", "", db_path)
+    return saved, sorted(failed)
+
+
+def sync_catalog(refresh=False, db_path=None):
+    # Imported here because app.cocktails reads from this module
+    from app.cocktails import fetch_ingredient_list_from_api
+    from app.similarity import build_similarity_index
+
+    ingredients = fetch_ingredient_list_from_api()
+    if not ingredients:
+        print("Could not fetch the ingredient list, catalog not updated")
+        return 0
+    save_ingredients(ingredients, db_path)
+
+    saved, failed = sweep_catalog(refresh, db_path)
+    if failed:
+        print(f"Catalog sync incomplete, letters {', '.join(failed)} failed; run it again to resume")
+        return saved
+
+    build_cooccurrence_index(db_path)
+    build_similarity_index(db_path)
+    set_meta("last_synced_at", str(time.time()), db_path)
+    write_catalog_snapshot(db_path)
+    print(f"Catalog synced: {len(ingredients)} ingredients, {saved} drinks updated")
+    return saved
+
+
+if __name__ == "__main__":
+    import sys
+    sync_catalog(refresh="--refresh" in sys.argv)
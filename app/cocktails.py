@@ -1,113 +1,254 @@
-import requests
+import heapq
 import os
+import sqlite3
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+
+from app import catalog
+from app.cache import SQLiteCache, create_cache
+from app.drink import Drink, as_drink
+from app.http_client import get_json, UpstreamError
+from app.measures import parse_volume_to_ounces
+from app.rate_limit import create_limiter
 
 BASE_URL = "https://www.thecocktaildb.com/api/json/v1/1"
+YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+
+# Request timeouts (seconds) for each upstream endpoint
+ENDPOINT_TIMEOUTS = {
+    "filter.php": 10,
+    "lookup.php": 10,
+    "list.php": 15,
+    "search.php": 15,
+    "youtube": 5,
+}
+
+# The free API tier starts answering 429 when hit too quickly, so every upstream
+# call takes a token from its service's bucket first. The buckets are shared by
+# all worker processes on the host (see app/rate_limit.py).
+COCKTAILDB_LIMITER = create_limiter("cocktaildb", rate=5, capacity=10)  # about 5 requests/second, bursts of 10
+YOUTUBE_LIMITER = create_limiter("youtube", rate=1, capacity=5)
+
+# Base spirits that are never suggested as mixers
+COMMON_ALCOHOLS = {'vodka', 'gin', 'rum', 'whiskey', 'tequila', 'bourbon', 'scotch', 'wine', 'beer', 'champagne', 'cognac', 'brandy', 'vermouth'}
+
+# How many drink detail lookups recommend_cocktails runs at the same time
+MAX_FETCH_WORKERS = 8
+
+# Cache lifetimes in seconds: (ttl, extra time an entry may be served stale while it refreshes)
+CACHE_TTLS = {
+    "lookup.php": (24 * 3600, 7 * 24 * 3600),
+    "filter.php": (6 * 3600, 24 * 3600),
+    "list.php": (24 * 3600, 7 * 24 * 3600),
+}
+NEGATIVE_CACHE_TTL = 10 * 60  # how long "no such drink" answers are remembered
+
+def encode_cached_value(value):
+    # Drinks are stored in the API's dict shape when the cache is shared on disk
+    if isinstance(value, Drink):
+        return {"drink": value.to_dict()}
+    return {"value": value}
+
+def decode_cached_value(data):
+    if "drink" in data:
+        return Drink.from_api(data["drink"])
+    return data["value"]
+
+# Upstream answers (drink details, filter lists, the ingredient list). Set
+# CACHE_BACKEND=sqlite to share one copy between all the workers on a host.
+catalog_cache = create_cache("upstream", maxsize=4096, encode=encode_cached_value, decode=decode_cached_value)
+
+# YouTube lookups cost API quota, so they're cached on disk by cocktail name
+YOUTUBE_CACHE_TTL = 30 * 24 * 3600
+YOUTUBE_NEGATIVE_CACHE_TTL = 24 * 3600
+youtube_cache = SQLiteCache("youtube")
+
+# The request_* functions talk to the API and raise UpstreamError on failure;
+# they return None / [] only when the API says there is nothing to return.
+
+def request_drinks_by_alcohol(alcohol):
+    data = get_json(f"{BASE_URL}/filter.php", params={"i": alcohol}, timeout=ENDPOINT_TIMEOUTS["filter.php"], limiter=COCKTAILDB_LIMITER)
+    drinks = data.get("drinks")
+    # The API answers {"drinks": "no data found"} for unknown ingredients
+    return drinks if isinstance(drinks, list) else []
+
+def request_drink_details(drink_id):
+    data = get_json(f"{BASE_URL}/lookup.php", params={"i": drink_id}, timeout=ENDPOINT_TIMEOUTS["lookup.php"], limiter=COCKTAILDB_LIMITER)
+    drinks = data.get("drinks")
+    if not drinks or not isinstance(drinks, list):
+        return None
+    return drinks[0]
+
+def request_ingredient_list():
+    data = get_json(f"{BASE_URL}/list.php", params={"i": "list"}, timeout=ENDPOINT_TIMEOUTS["list.php"], limiter=COCKTAILDB_LIMITER)
+    ingredients_data = data.get("drinks") or []
+    ingredients = []
+    for ing_dict in ingredients_data:
+        ing_name = ing_dict.get("strIngredient1")
+        if ing_name:
+            ingredients.append(ing_name.strip())
+    return sorted(ingredients)
+
+def request_drinks_by_first_letter(letter):
+    # Full records for every drink whose name starts with `letter`, in the same
+    # shape fetch_drink_details returns
+    data = get_json(f"{BASE_URL}/search.php", params={"f": letter}, timeout=ENDPOINT_TIMEOUTS["search.php"], limiter=COCKTAILDB_LIMITER)
+    drinks = data.get("drinks")
+    if not isinstance(drinks, list):
+        return []
+    return [Drink.from_api(d).to_dict() for d in drinks if isinstance(d, dict) and d.get("idDrink")]
+
+def fetch_ingredient_list_from_api():
+    try:
+        return request_ingredient_list()
+    except UpstreamError as e:
+        print(f"Error fetching ingredient list: {e}")
+        return []
+
+# The fetch_* functions below are what the rest of the app uses. They go through
+# catalog_cache first, then the local catalog (see app/catalog.py), and only call
+# the API when neither has the answer.
+
+def load_drinks_by_alcohol(alcohol):
+    if catalog.is_populated():
+        return catalog.get_drinks_by_ingredient(alcohol)
+    return request_drinks_by_alcohol(alcohol)
+
+def load_local_drink(drink_id):
+    # The drink from the catalog snapshot or database, or None if it isn't synced
+    snapshot = catalog.get_snapshot()
+    drink = snapshot.get_drink(drink_id) if snapshot else None
+    if drink:
+        return drink
+    detail = catalog.get_drink(drink_id)
+    return Drink.from_api(detail) if detail else None
+
+def load_drink(drink_id):
+    # Drinks are parsed into a compact Drink once, here, and cached in that form
+    drink = load_local_drink(drink_id)
+    if drink:
+        return drink
+    detail = request_drink_details(drink_id)
+    return Drink.from_api(detail) if detail else None
+
+def load_ingredient_list():
+    if catalog.is_populated():
+        ingredients = catalog.get_ingredient_list()
+        if ingredients:
+            return ingredients
+    return request_ingredient_list()
 
 def fetch_drinks_by_alcohol(alcohol):
+    key = ("filter.php", alcohol.strip().lower())
+    ttl, stale_ttl = CACHE_TTLS["filter.php"]
     try:
-        response = requests.get(f"{BASE_URL}/filter.php", params={"i": alcohol})
-        if response.status_code != 200:
-            return []
-        data = response.json()
-        return data.get("drinks") or []
-    except Exception as e:
+        return catalog_cache.get_or_load(key, lambda: load_drinks_by_alcohol(alcohol), ttl, stale_ttl, NEGATIVE_CACHE_TTL)
+    except UpstreamError as e:
         print(f"Error fetching drinks for {alcohol}: {e}")
         return []
 
-def fetch_drink_details(drink_id):
+def fetch_drink(drink_id):
+    key = ("lookup.php", str(drink_id))
+    ttl, stale_ttl = CACHE_TTLS["lookup.php"]
     try:
-        response = requests.get(f"{BASE_URL}/lookup.php", params={"i": drink_id}, timeout=10)
-        if response.status_code == 429:
-            print(f"Rate limited (429) for drink_id {drink_id}")
-            return None
-        if response.status_code != 200:
-            print(f"API returned status {response.status_code} for drink_id {drink_id}")
-            return None
-        data = response.json()
-        drinks = data.get("drinks")
-        if not drinks:
-            print(f"No drink details found for drink_id {drink_id}")
-            return None
-        return drinks[0]
-    except requests.exceptions.Timeout:
-        print(f"Timeout fetching details for drink_id {drink_id}")
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"Network error fetching details for drink_id {drink_id}: {e}")
-        return None
-    except Exception as e:
-        print(f"Unexpected error fetching details for drink_id {drink_id}: {e}")
+        drink = catalog_cache.get_or_load(key, lambda: load_drink(drink_id), ttl, stale_ttl, NEGATIVE_CACHE_TTL)
+    except UpstreamError as e:
+        print(f"Error fetching details for drink_id {drink_id} ({e.kind}): {e}")
         return None
+    if not drink:
+        print(f"No drink details found for drink_id {drink_id}")
+    return drink
+
+def fetch_drink_details(drink_id):
+    # Same as fetch_drink, but in the API's raw dict shape
+    drink = fetch_drink(drink_id)
+    return drink.to_dict() if drink else None
 
 def fetch_ingredient_list():
+    ttl, stale_ttl = CACHE_TTLS["list.php"]
     try:
-        response = requests.get(f"{BASE_URL}/list.php", params={"i": "list"})
-        if response.status_code != 200:
-            return []
-        data = response.json()
-        ingredients_data = data.get("drinks") or []
-        ingredients = []
-        for ing_dict in ingredients_data:
-            ing_name = ing_dict.get("strIngredient1")
-            if ing_name:
-                ingredients.append(ing_name.strip())
-        return sorted(ingredients)
-    except Exception as e:
+        return catalog_cache.get_or_load(("list.php",), load_ingredient_list, ttl, stale_ttl)
+    except UpstreamError as e:
         print(f"Error fetching ingredient list: {e}")
         return []
 
-def get_mixer_match_score(drink, mixers):
-    # Get all ingredients from the drink recipe
-    ingredients = []
-    for n in range(1, 16):
-        ing = drink.get(f"strIngredient{n}")
-        if ing and ing.strip():
-            ingredients.append(ing.strip().lower())
+def find_compatible_mixers(alcohols):
+    # Mixers seen in catalog recipes with any of the alcohols, most common first:
+    # [(mixer, drink_count), ...]. Returns None if the catalog hasn't been synced yet.
+    if not catalog.has_cooccurrence_index():
+        return None
+    return catalog.get_cooccurring_ingredients(alcohols, exclude=COMMON_ALCOHOLS)
 
-    # If no mixers specified, any drink matches with score 0
-    if not mixers:
-        return 0
-
-    # Common ingredient aliases for better matching
-    aliases = {
-        "cola": ["coca-cola", "coke", "cola", "coca cola"],
-        "coca-cola": ["cola", "coke", "coca-cola", "coca cola"],
-        "coke": ["cola", "coca-cola", "coke"],
-        "orange juice": ["orange juice", "oj", "orange"],
-        "lemon juice": ["lemon juice", "lemon"],
-        "lime juice": ["lime juice", "lime"],
-        "sugar": ["sugar", "sugar syrup", "syrup"],
-        "soda": ["soda water", "club soda", "soda"],
-        "tonic": ["tonic water", "tonic"],
+def cache_stats():
+    return {
+        "catalog_cache": catalog_cache.stats(),
+        "rate_limits": {"cocktaildb": COCKTAILDB_LIMITER.stats(), "youtube": YOUTUBE_LIMITER.stats()},
     }
 
-    match_count = 0
-    matched_mixers = set()
-
-    # Check each user mixer against all recipe ingredients
-    for user_mixer in mixers:
-        user_mixer_clean = user_mixer.lower().strip()
-
+# Common ingredient aliases for better matching
+INGREDIENT_ALIASES = {
+    "cola": ["coca-cola", "coke", "cola", "coca cola"],
+    "coca-cola": ["cola", "coke", "coca-cola", "coca cola"],
+    "coke": ["cola", "coca-cola", "coke"],
+    "orange juice": ["orange juice", "oj", "orange"],
+    "lemon juice": ["lemon juice", "lemon"],
+    "lime juice": ["lime juice", "lime"],
+    "sugar": ["sugar", "sugar syrup", "syrup"],
+    "soda": ["soda water", "club soda", "soda"],
+    "tonic": ["tonic water", "tonic"],
+}
+
+class MixerMatcher:
+    # Matches a user's mixers against recipes. Built once per request: the
+    # normalized mixer names, alias expansions and word sets are computed up
+    # front, and the result for each distinct recipe ingredient is memoized, so
+    # scoring many drinks only does set lookups for ingredients already seen.
+
+    def __init__(self, mixers):
+        self.mixers = []
+        for mixer in dict.fromkeys(mixers or []):
+            clean = mixer.lower().strip()
+            # Recipe ingredients that count as this mixer through the alias table,
+            # in either direction
+            alias_targets = set(INGREDIENT_ALIASES.get(clean, []))
+            alias_targets.update(name for name, names in INGREDIENT_ALIASES.items() if clean in names)
+            self.mixers.append((mixer, clean, frozenset(alias_targets), frozenset(clean.split())))
+        self.ingredient_matches = {}
+
+    def matches_for(self, recipe_ing):
+        """Indexes of the user mixers that `recipe_ing` (lowercased) satisfies."""
+        matches = self.ingredient_matches.get(recipe_ing)
+        if matches is None:
+            recipe_words = recipe_ing.split()
+            matches = frozenset(
+                i for i, (_, clean, alias_targets, words) in enumerate(self.mixers)
+                if recipe_ing in alias_targets
+                or clean in recipe_ing or recipe_ing in clean
+                or not words.isdisjoint(recipe_words)
+            )
+            self.ingredient_matches[recipe_ing] = matches
+        return matches
+
+    def score_ingredients(self, ingredients):
+        matched = set()
         for recipe_ing in ingredients:
-            # Check aliases first
-            if (user_mixer_clean in aliases.get(recipe_ing, []) or
-                recipe_ing in aliases.get(user_mixer_clean, [])):
-                matched_mixers.add(user_mixer)
+            matched.update(self.matches_for(recipe_ing))
+            if len(matched) == len(self.mixers):
                 break
+        return len(matched)
 
-            # Check if one contains the other
-            if user_mixer_clean in recipe_ing or recipe_ing in user_mixer_clean:
-                matched_mixers.add(user_mixer)
-                break
+    def score(self, drink):
+        # Number of user mixers that appear in the drink's recipe
+        if not self.mixers:
+            return 0
+        return self.score_ingredients(as_drink(drink).ingredient_keys)
 
-            # Check for word overlaps (like "orange" in "orange juice")
-            user_words = set(user_mixer_clean.split())
-            recipe_words = set(recipe_ing.split())
-            if user_words.intersection(recipe_words):
-                matched_mixers.add(user_mixer)
-                break
+    def score_many(self, drinks):
+        return [self.score(drink) for drink in drinks]
 
-    return len(matched_mixers)
+def get_mixer_match_score(drink, mixers):
+    return MixerMatcher(mixers).score(drink)
 
 def drink_matches_mixers(drink, mixers):
     # Keep backward compatibility: if no mixers specified, any drink matches
@@ -115,92 +256,33 @@ def drink_matches_mixers(drink, mixers):
         return True
     return get_mixer_match_score(drink, mixers) > 0
 
-def parse_volume_to_ounces(measure_text):
-    # If there's no measurement text, return 0
-    if not measure_text:
-        return 0.0
-
-    # Convert to lowercase and split into words
-    text = measure_text.lower()
-
-    # If it's marked as garnish or common garnish terms, it's not a measurable amount
-    garnish_terms = ["garnish", "wedge", "slice", "twist", "wheel", "peel", "sprig", "leaf", "leaves"]
-    if any(term in text for term in garnish_terms):
-        return 0.0
-
-    tokens = text.replace("(", " ").replace(")", " ").split()
-
-    total = 0.0
-
-    # Go through each word/token
-    for tok in tokens:
-        # Handle fractions like "1/2"
-        if "/" in tok:
-            try:
-                num, den = tok.split("/")
-                total += float(num) / float(den)
-                continue
-            except:
-                pass
-
-        # Try to convert to a number
-        try:
-            total += float(tok)
-            continue
-        except:
-            # Handle concatenated units like "12oz", "50ml"
-            # Extract number from start of string
-            num_str = ""
-            unit_str = ""
-            for i, char in enumerate(tok):
-                if char.isdigit() or char == '.':
-                    num_str += char
-                else:
-                    unit_str = tok[i:]
-                    break
-
-            if num_str:
-                try:
-                    total += float(num_str)
-                    # Check for units in the remaining part
-                    if "ml" in unit_str:
-                        total *= 0.0338
-                    elif "cl" in unit_str:
-                        total *= 0.338
-                    # oz is already in ounces, no conversion needed
-                    continue
-                except:
-                    pass
-
-    # Special handling for ice
-    if "ice" in text or "cube" in text:
-        if total == 0:
-            total = 4.0  # Default ice amount
-        if "cube" in text:
-            if total < 2:
-                total = 3 * 1.5  # Assume 3 cubes if no number given
-            else:
-                total = total * 1.5  # Convert cube count to ounces
-
-    # If we still have 0, return 0
-    if total == 0:
-        return 0
-
-    # Convert different units to ounces (for space-separated cases)
-    if "cup" in text or "cups" in text:
-        return total * 8.0  # 1 cup = 8 fluid ounces
-    if "ml" in text and any(tok == "ml" for tok in tokens):  # Only convert if "ml" is a separate token
-        return total * 0.0338
-    if "cl" in text and any(tok == "cl" for tok in tokens):  # Only convert if "cl" is a separate token
-        return total * 0.338
-
-    return total
-
-def recommend_cocktails(user_prefs, max_results=50):
-    alcohols = user_prefs["alcohol_types"]
-    mixers = user_prefs["mixers"]
+def fetch_drinks_many(drink_ids, max_workers=MAX_FETCH_WORKERS):
+    # Look up several drinks at once; results come back in the same order as drink_ids
+    # (None for drinks that couldn't be fetched). COCKTAILDB_LIMITER keeps the
+    # combined request rate under the API limit.
+    drink_ids = list(drink_ids)
+    if len(drink_ids) <= 1 or max_workers <= 1:
+        return [fetch_drink(drink_id) for drink_id in drink_ids]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(drink_ids))) as executor:
+        return list(executor.map(fetch_drink, drink_ids))
+
+def iter_drinks_as_completed(drink_ids, max_workers=MAX_FETCH_WORKERS):
+    # Yield (drink_id, drink) pairs as soon as each lookup finishes
+    drink_ids = list(drink_ids)
+    if not drink_ids:
+        return
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(drink_ids))))
+    try:
+        futures = {executor.submit(fetch_drink, drink_id): drink_id for drink_id in drink_ids}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # If the consumer stops early (e.g. the browser went away) don't wait for the rest
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def get_candidate_ids(alcohols):
     seen = set()
-    results = []
+    drink_ids = []
     for alc in alcohols:
         # Limit drinks per alcohol to avoid too many API calls
         drinks = fetch_drinks_by_alcohol(alc)[:20]  # Limit to 20 per alcohol
@@ -211,128 +293,241 @@ def recommend_cocktails(user_prefs, max_results=50):
             drink_id = d["idDrink"]
             if drink_id in seen:
                 continue
-            detail = fetch_drink_details(drink_id)
-            if not detail:
-                continue
-            # Calculate match score
-            score = get_mixer_match_score(detail, mixers)
-            if score == 0 and mixers:
-                continue  # Skip if no matches and user specified mixers
-            ingredients = []
-            for n in range(1, 16):
-                ing = detail.get(f"strIngredient{n}")
-                measure = detail.get(f"strMeasure{n}")
-                if ing and ing.strip():
-                    ingredients.append((measure or "").strip() + " " + ing.strip())
-            results.append({
-                "name": detail["strDrink"],
-                "id": drink_id,
-                "ingredients": ingredients,
-                "instructions": detail.get("strInstructions", "").strip(),
-                "thumb": detail.get("strDrinkThumb"),
-                "detail": detail,
-                "match_score": score
-            })
             seen.add(drink_id)
-    # Sort by match_score descending, then by name ascending
-    results.sort(key=lambda x: (-x["match_score"], x["name"]))
-    return results[:max_results]
+            drink_ids.append(drink_id)
+    return drink_ids
 
+def build_recommendation(drink_id, drink, matcher):
+    # Lightweight result dict for one candidate, or None if it doesn't match the
+    # user's mixers. Ingredients and instructions are added per page by add_recommendation_details.
+    if not drink:
+        return None
+    # Calculate match score
+    score = matcher.score_ingredients(drink.ingredient_keys) if matcher.mixers else 0
+    if score == 0 and matcher.mixers:
+        return None  # Skip if no matches and user specified mixers
+    return {
+        "name": drink.name,
+        "id": drink_id,
+        "thumb": drink.thumb,
+        "match_score": score
+    }
 
+def recommendation_sort_key(result):
+    # match_score descending, then name; the id makes the order total, so pages never overlap
+    return (-result["match_score"], result["name"], result["id"])
+
+def sort_recommendations(results, max_results=50):
+    # The best max_results by recommendation_sort_key, with a heap instead of
+    # sorting every candidate (max_results=None sorts them all)
+    if max_results is None:
+        return sorted(results, key=recommendation_sort_key)
+    return heapq.nsmallest(max_results, results, key=recommendation_sort_key)
+
+def add_recommendation_details(results, loaded=None):
+    # Fill in ingredients and instructions for the results about to be shown.
+    # Drinks already in `loaded` ({drink_id: Drink}) aren't looked up again.
+    loaded = loaded or {}
+    missing = [result["id"] for result in results if result["id"] not in loaded]
+    loaded = {**loaded, **dict(zip(missing, fetch_drinks_many(missing)))}
+    for result in results:
+        drink = loaded.get(result["id"])
+        result["ingredients"] = drink.ingredient_lines if drink else []
+        result["instructions"] = drink.instructions if drink else ""
+    return results
+
+def iter_recommendations(user_prefs, loaded=None):
+    # Yield scored candidates in whatever order their details arrive (unsorted).
+    # Every fetched drink is also put in `loaded`, if given.
+    matcher = MixerMatcher(user_prefs["mixers"])
+    drink_ids = get_candidate_ids(user_prefs["alcohol_types"])
+    for drink_id, drink in iter_drinks_as_completed(drink_ids):
+        if loaded is not None:
+            loaded[drink_id] = drink
+        result = build_recommendation(drink_id, drink, matcher)
+        if result:
+            yield result
 
-def generate_unique_color(ingredient_name):
-    distinct_colors = [
-        "#DC143C",
-        "#FF4500",
-        "#32CD32",
-        "#00CED1",
-        "#1E90FF",
-        "#9370DB",
-        "#FF69B4",
-        "#8B4513",
-        "#20B2AA",
-        "#FF6347",
-        "#4682B4",
-        "#CD5C5C",
-        "#40E0D0",
-        "#800080",
-        "#008000",
-        "#FFA500",
-        "#FF0000",
-        "#0000FF",
-        "#FFD700",
-        "#228B22",
-        "#FF00FF",
-        "#00FFFF",
-        "#800000",
-        "#808000",
-        "#008080",
-        "#000080",
-        "#696969",
-        "#8B0000",
-        "#8A2BE2",
-        "#FF1493",
-    ]
+def recommend_cocktails(user_prefs, max_results=50):
+    # The top results' details come from the drinks loaded for scoring
+    loaded = {}
+    results = sort_recommendations(iter_recommendations(user_prefs, loaded), max_results)
+    return add_recommendation_details(results, loaded)
+
+class RecommendationStream:
+    # Iterates over recommendations as they arrive and remembers them, so a
+    # streamed page can render cards progressively and ask for the final,
+    # sorted top results once iteration is done. on_done gets every result.
+
+    def __init__(self, user_prefs, max_results=50, on_done=None):
+        self.user_prefs = user_prefs
+        self.max_results = max_results
+        self.results = []
+        # Called once, with the final results, or with None if iteration was
+        # cut short or never started
+        self.on_done = on_done
+        self.done = False
+
+    def _finish(self, results):
+        if not self.done:
+            self.done = True
+            if self.on_done is not None:
+                self.on_done(results)
+
+    def __iter__(self):
+        completed = False
+        try:
+            for result in iter_recommendations(self.user_prefs):
+                self.results.append(result)
+                yield result
+            completed = True
+        finally:
+            self._finish(list(self.results) if completed else None)
 
-    hash_value = hash(ingredient_name.lower().strip())
-    color_index = hash_value % len(distinct_colors)
-    return distinct_colors[color_index]
+    def close(self):
+        # For when the response ends: a stream that never finished iterating counts as aborted
+        self._finish(None)
 
-def search_youtube_tutorial(cocktail_name):
-    search_query = f"how to make {cocktail_name} cocktail recipe"
-    api_key = os.environ.get("YOUTUBE_API_KEY")
+    def final(self):
+        return sort_recommendations(self.results, self.max_results)
 
-    if not api_key:
-        print(f"Warning: No YOUTUBE_API_KEY found. Cannot fetch videos for {cocktail_name}")
-        return {
-            "video_id": None,
-            "video_title": None,
-            "search_query": search_query,
-            "api_key_missing": True
-        }
+    def final_ids(self):
+        return [result["id"] for result in self.final()]
 
-    try:
-        search_url = "https://www.googleapis.com/youtube/v3/search"
-        params = {
-            "part": "snippet",
-            "q": search_query,
-            "type": "video",
-            "maxResults": 3,
-            "videoDuration": "short",
-            "relevanceLanguage": "en",
-            "key": api_key
-        }
 
-        response = requests.get(search_url, params=params, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            items = data.get("items", [])
-
-            if items:
-                video = items[0]
-                video_id = video["id"]["videoId"]
-                video_title = video["snippet"]["title"]
-                video_description = video["snippet"]["description"]
-
-                return {
-                    "video_id": video_id,
-                    "video_title": video_title,
-                    "video_description": video_description,
-                    "search_query": search_query,
-                    "api_key_missing": False
-                }
-        else:
-            print(f"YouTube API returned status {response.status_code} for {cocktail_name}")
-
-    except Exception as e:
-        print(f"Error searching YouTube for {cocktail_name}: {e}")
 
+# Cup graphic colors. Picked from the ingredient name with crc32, which (unlike
+# the salted built-in hash()) gives the same color in every worker and after restarts.
+INGREDIENT_PALETTE = [
+    "#DC143C", "#FF4500", "#32CD32", "#00CED1", "#1E90FF",
+    "#9370DB", "#FF69B4", "#8B4513", "#20B2AA", "#FF6347",
+    "#4682B4", "#CD5C5C", "#40E0D0", "#800080", "#008000",
+    "#FFA500", "#FF0000", "#0000FF", "#FFD700", "#228B22",
+    "#FF00FF", "#00FFFF", "#800000", "#808000", "#008080",
+    "#000080", "#696969", "#8B0000", "#8A2BE2", "#FF1493",
+]
+ICE_COLOR = "#87CEEB"  # Light blue for ice
+
+def palette_index(ingredient_name):
+    return zlib.crc32(ingredient_name.lower().strip().encode("utf-8")) % len(INGREDIENT_PALETTE)
+
+def generate_unique_color(ingredient_name):
+    return INGREDIENT_PALETTE[palette_index(ingredient_name)]
+
+def assign_ingredient_colors(ingredients):
+    # {ingredient: color} with no repeats inside one drink: each ingredient gets its
+    # own stable color unless another ingredient already took it, then the next free one
+    colors = {}
+    used = set()
+    for ing in ingredients:
+        if ing in colors:
+            continue
+        if ing.lower() == "ice":
+            colors[ing] = ICE_COLOR
+            continue
+        index = palette_index(ing)
+        if len(used) < len(INGREDIENT_PALETTE):
+            while index in used:
+                index = (index + 1) % len(INGREDIENT_PALETTE)
+        used.add(index)
+        colors[ing] = INGREDIENT_PALETTE[index]
+    return colors
+
+def youtube_search_params(search_query, api_key):
     return {
+        "part": "snippet",
+        "q": search_query,
+        "type": "video",
+        "maxResults": 3,
+        "videoDuration": "short",
+        "relevanceLanguage": "en",
+        "key": api_key
+    }
+
+def youtube_video_result(search_query, data=None, api_key_missing=False, error=None):
+    # Template-ready result for a YouTube search response (or for no response at all,
+    # in which case `error` is the UpstreamError kind)
+    items = (data or {}).get("items", [])
+    if items:
+        video = items[0]
+        return {
+            "video_id": video["id"]["videoId"],
+            "video_title": video["snippet"]["title"],
+            "video_description": video["snippet"]["description"],
+            "search_query": search_query,
+            "api_key_missing": False
+        }
+    result = {
         "video_id": None,
         "video_title": None,
         "search_query": search_query,
-        "api_key_missing": False
+        "api_key_missing": api_key_missing
     }
+    if error:
+        result["error"] = error
+    return result
+
+def youtube_search(cocktail_name):
+    # (search_query, api_key) for a cocktail's tutorial search; api_key is None when it isn't configured
+    api_key = os.environ.get("YOUTUBE_API_KEY")
+    if not api_key:
+        print(f"Warning: No YOUTUBE_API_KEY found. Cannot fetch videos for {cocktail_name}")
+    return f"how to make {cocktail_name} cocktail recipe", api_key
+
+def parse_youtube_response(search_query, data):
+    try:
+        return youtube_video_result(search_query, data)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise UpstreamError("bad_response", f"Unexpected YouTube response: {e}")
+
+def youtube_error_result(cocktail_name, search_query, error):
+    print(f"YouTube API error for {cocktail_name} ({error.kind}): {error}")
+    return youtube_video_result(search_query, error=error.kind)
+
+def request_youtube_tutorial(search_query, api_key):
+    # Raises UpstreamError when YouTube can't be reached or answers with an error
+    data = get_json(YOUTUBE_SEARCH_URL, params=youtube_search_params(search_query, api_key), timeout=ENDPOINT_TIMEOUTS["youtube"], limiter=YOUTUBE_LIMITER)
+    return parse_youtube_response(search_query, data)
+
+def search_youtube_tutorial(cocktail_name):
+    search_query, api_key = youtube_search(cocktail_name)
+    if not api_key:
+        return youtube_video_result(search_query, api_key_missing=True)
+    try:
+        return request_youtube_tutorial(search_query, api_key)
+    except UpstreamError as e:
+        return youtube_error_result(cocktail_name, search_query, e)
+
+def youtube_cache_key(cocktail_name):
+    return " ".join(cocktail_name.lower().split())
+
+def get_cached_youtube_tutorial(cocktail_name):
+    # A cache that can't be read (locked, unwritable or corrupt file) is a miss
+    try:
+        return youtube_cache.get(youtube_cache_key(cocktail_name))
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"YouTube cache unavailable ({e}), looking {cocktail_name} up again")
+        return None
+
+def cache_youtube_tutorial(cocktail_name, result):
+    # Found videos are kept for a month, "no video" answers for a day. Errors and
+    # a missing API key are never cached, so they're retried on the next view.
+    if result.get("error") or result.get("api_key_missing"):
+        return
+    ttl = YOUTUBE_CACHE_TTL if result["video_id"] else YOUTUBE_NEGATIVE_CACHE_TTL
+    try:
+        youtube_cache.set(youtube_cache_key(cocktail_name), result, ttl)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Couldn't cache the YouTube tutorial for {cocktail_name}: {e}")
+
+def fetch_youtube_tutorial(cocktail_name):
+    # search_youtube_tutorial backed by the persistent youtube_cache
+    cached = get_cached_youtube_tutorial(cocktail_name)
+    if cached is not None:
+        return cached
+    result = search_youtube_tutorial(cocktail_name)
+    cache_youtube_tutorial(cocktail_name, result)
+    return result
 
 def is_solid_ingredient(ingredient_name):
     solid_keywords = [
@@ -382,15 +577,17 @@ def parse_ice_proportion_from_instructions(instructions):
 
     return None
 
-def infer_missing_amounts(ingredients_data, cocktail_name=""):
+def infer_missing_amounts(ingredients_data, cocktail_name="", volumes=None):
+    # volumes: the measures already parsed to ounces, if the caller has them
     name_lower = cocktail_name.lower()
+    if volumes is None:
+        volumes = [parse_volume_to_ounces(measure or "") for _, measure in ingredients_data]
 
     # Collect specified and missing ingredients
     specified = []
     missing = []
 
-    for ing, measure in ingredients_data:
-        volume = parse_volume_to_ounces(measure or "")
+    for (ing, measure), volume in zip(ingredients_data, volumes):
         if volume > 0 and not is_solid_ingredient(ing):
             specified.append((ing, volume))
         elif not is_solid_ingredient(ing):
@@ -421,80 +618,90 @@ def infer_missing_amounts(ingredients_data, cocktail_name=""):
 
     return specified + [(ing, 0) for ing in missing]
 
-def standardize_ingredients_to_cup(detail, cup_size_oz=16.0):
-    ingredients_volumes = []
-    total_volume = 0.0
+# Cup sizes standardize_catalog prepares by default: 12/16/18 oz cups and a 64 oz pitcher
+CUP_SIZES = (12.0, 16.0, 18.0, 64.0)
 
-    cocktail_name = detail.get("strDrink", "").lower()
+def get_cup_proportions(detail):
+    # Size-independent cup layout of a drink, computed once per recipe and cached
+    drink = as_drink(detail)
+    return compute_cup_proportions(drink.name, drink.pairs, drink.instructions, drink.ounces)
+
+@lru_cache(maxsize=2048)
+def compute_cup_proportions(name, pairs, instructions, ounces=None):
+    """Return ((ingredient, fraction_of_cup, fixed_oz), ...).
+
+    Every standardized volume is fraction_of_cup * cup_size + fixed_oz, so any cup
+    size is a multiply away. fixed_oz is only non-zero for the few volumes the
+    original algorithm leaves unscaled. `ounces` is each pair's measure already
+    parsed (e.g. from the catalog snapshot).
+    """
+    cocktail_name = name.lower()
+    if ounces is None:
+        ounces = [parse_volume_to_ounces(measure or "") for _, measure in pairs]
 
     # Collect all liquid ingredients with their measures
     all_ingredients = []
-    for n in range(1, 16):
-        ing = detail.get(f"strIngredient{n}")
-        measure = detail.get(f"strMeasure{n}")
-        if ing and ing.strip():
-            ing_clean = ing.strip()
-            measure_clean = (measure or "").strip()
-
-            # Special handling for known garnish ingredients in specific cocktails
-            is_garnish = False
-            if "3-mile long island iced tea" in cocktail_name and "lemon" in ing_clean.lower():
-                is_garnish = True
-            elif any(term in measure_clean.lower() for term in ["garnish", "wedge", "slice", "twist", "wheel", "peel", "sprig", "leaf", "leaves"]):
-                is_garnish = True
-            # Additional check: if measure is just a small number and ingredient is a common garnish
-            elif measure_clean and measure_clean.replace(".", "").isdigit() and float(measure_clean) <= 2.0 and ing_clean.lower() in ["lemon", "lime", "orange"]:
-                is_garnish = True
-
-            if not is_garnish and not is_solid_ingredient(ing_clean):
-                all_ingredients.append((ing_clean, measure_clean))
+    volumes = []
+    for (ing_clean, measure_clean), oz in zip(pairs, ounces):
+        # Special handling for known garnish ingredients in specific cocktails
+        is_garnish = False
+        if "3-mile long island iced tea" in cocktail_name and "lemon" in ing_clean.lower():
+            is_garnish = True
+        elif any(term in measure_clean.lower() for term in ["garnish", "wedge", "slice", "twist", "wheel", "peel", "sprig", "leaf", "leaves"]):
+            is_garnish = True
+        # Additional check: if measure is just a small number and ingredient is a common garnish
+        elif measure_clean and measure_clean.replace(".", "").isdigit() and float(measure_clean) <= 2.0 and ing_clean.lower() in ["lemon", "lime", "orange"]:
+            is_garnish = True
+
+        if not is_garnish and not is_solid_ingredient(ing_clean):
+            all_ingredients.append((ing_clean, measure_clean))
+            volumes.append(oz)
 
     # Infer missing amounts based on cocktail conventions
-    cocktail_name = detail.get("strDrink", "")
-    ingredients_volumes = infer_missing_amounts(all_ingredients, cocktail_name)
+    ingredients_volumes = infer_missing_amounts(all_ingredients, name, volumes)
 
     # Calculate total volume
     total_volume = sum(vol for _, vol in ingredients_volumes)
 
     # Check for ice proportion in instructions
-    ice_proportion = parse_ice_proportion_from_instructions(detail.get("strInstructions", ""))
-    ice_adjusted = False
-    ice_volume = 0
+    ice_proportion = parse_ice_proportion_from_instructions(instructions)
+    ice_index = None
 
     if ice_proportion is not None:
-        # Find ice in ingredients
+        # Find ice in ingredients; it will take up ice_proportion of the cup
         for i, (ing, vol_oz) in enumerate(ingredients_volumes):
             if ing.lower() == "ice":
-                # Adjust ice volume based on instructions
-                ice_volume = ice_proportion * cup_size_oz
-                ingredients_volumes[i] = (ing, ice_volume)
-                total_volume = total_volume - (vol_oz or 0) + ice_volume
-                ice_adjusted = True
+                ice_index = i
+                total_volume = total_volume - (vol_oz or 0)
                 break
 
     # If no volumes found, return empty list
-    if total_volume == 0:
-        return []
+    if total_volume == 0 and ice_index is None:
+        return ()
 
-    # Handle scaling based on whether ice was adjusted
-    if ice_adjusted:
-        # Scale non-ice ingredients to fit remaining space
-        remaining_space = cup_size_oz - ice_volume
-        non_ice_volumes = [(ing, vol_oz) for ing, vol_oz in ingredients_volumes if ing.lower() != "ice"]
-        if non_ice_volumes:
-            non_ice_total = sum(vol_oz for _, vol_oz in non_ice_volumes)
-            if non_ice_total > 0:
-                scale_factor = remaining_space / non_ice_total
-                ingredients_volumes = [(ing, vol_oz * scale_factor) if ing.lower() != "ice" else (ing, vol_oz) for ing, vol_oz in ingredients_volumes]
+    proportions = []
+    if ice_index is not None:
+        # Scale non-ice ingredients to fit the space left over by the ice
+        non_ice_total = sum(vol_oz for ing, vol_oz in ingredients_volumes if ing.lower() != "ice")
+        for i, (ing, vol_oz) in enumerate(ingredients_volumes):
+            if i == ice_index:
+                proportions.append((ing, ice_proportion, 0.0))
+            elif ing.lower() == "ice" or non_ice_total <= 0:
+                proportions.append((ing, 0.0, vol_oz))
+            else:
+                proportions.append((ing, vol_oz * (1 - ice_proportion) / non_ice_total, 0.0))
     else:
         # Normal scaling to fit entire cup
-        if total_volume > 0:
-            scale_factor = cup_size_oz / total_volume
-            ingredients_volumes = [(ing, vol_oz * scale_factor) for ing, vol_oz in ingredients_volumes]
+        for ing, vol_oz in ingredients_volumes:
+            proportions.append((ing, vol_oz / total_volume, 0.0))
+    return tuple(proportions)
 
+def scale_cup_proportions(proportions, cup_size_oz=16.0):
+    # [(ingredient, volume_oz, percentage), ...] for a cup of cup_size_oz
     standardized = []
     cumulative_pct = 0.0
-    for ing, vol_oz in ingredients_volumes:
+    for ing, fraction, fixed_oz in proportions:
+        vol_oz = fraction * cup_size_oz + fixed_oz
         percentage = (vol_oz / cup_size_oz) * 100
         standardized.append((ing, vol_oz, percentage))
         cumulative_pct += percentage
@@ -504,3 +711,17 @@ def standardize_ingredients_to_cup(detail, cup_size_oz=16.0):
         standardized[-1] = (standardized[-1][0], standardized[-1][1], 100.0 - (cumulative_pct - percentage))
 
     return standardized
+
+def standardize_ingredients_to_cup(detail, cup_size_oz=16.0):
+    return scale_cup_proportions(get_cup_proportions(detail), cup_size_oz)
+
+def standardize_catalog(cup_sizes=CUP_SIZES, drink_ids=None):
+    # {drink_id: {cup_size: standardized}} for every drink in the local catalog
+    if drink_ids is None:
+        drink_ids = catalog.get_all_drink_ids()
+    standardized = {}
+    for drink in fetch_drinks_many(drink_ids):
+        if drink:
+            proportions = get_cup_proportions(drink)
+            standardized[drink.id] = {size: scale_cup_proportions(proportions, size) for size in cup_sizes}
+    return standardized
@@ -0,0 +1,89 @@
+import sys
+
+
+class Drink:
+    # Compact, parsed form of a TheCocktailDB drink record.
+    #
+    # The API returns ~50 keys per drink (strIngredient1..15, strMeasure1..15,
+    # translations, ...). A Drink keeps only what the app uses, with the
+    # ingredient/measure pairs split and stripped once and the ingredient names
+    # interned, since the same few hundred names repeat across every recipe.
+    __slots__ = ("id", "name", "instructions", "thumb", "category", "alcoholic", "glass", "pairs", "ingredient_keys", "ounces")
+
+    def __init__(self, id, name, instructions="", thumb=None, category=None, alcoholic=None, glass=None, pairs=(), ounces=None):
+        self.id = id
+        self.name = name
+        self.instructions = instructions
+        self.thumb = thumb
+        self.category = category
+        self.alcoholic = alcoholic
+        self.glass = glass
+        # ((ingredient, measure), ...) in recipe order; measure is "" when the API has none
+        self.pairs = tuple((sys.intern(ing), measure) for ing, measure in pairs)
+        # Lowercased ingredient names, used for matching
+        self.ingredient_keys = tuple(sys.intern(ing.lower()) for ing, _ in self.pairs)
+        # Each pair's measure already parsed to ounces (drinks from the catalog
+        # snapshot), or None to parse on demand
+        self.ounces = tuple(ounces) if ounces is not None else None
+
+    @classmethod
+    def from_api(cls, detail):
+        pairs = []
+        for n in range(1, 16):
+            ing = detail.get(f"strIngredient{n}")
+            if ing and ing.strip():
+                pairs.append((ing.strip(), (detail.get(f"strMeasure{n}") or "").strip()))
+        drink_id = detail.get("idDrink")
+        return cls(
+            id=str(drink_id) if drink_id is not None else None,
+            name=(detail.get("strDrink") or "").strip(),
+            instructions=(detail.get("strInstructions") or "").strip(),
+            thumb=detail.get("strDrinkThumb"),
+            category=detail.get("strCategory"),
+            alcoholic=detail.get("strAlcoholic"),
+            glass=detail.get("strGlass"),
+            pairs=pairs,
+        )
+
+    @property
+    def ingredients(self):
+        return [ing for ing, _ in self.pairs]
+
+    def measure_ounces(self):
+        # Parsed measure of each pair, in recipe order
+        if self.ounces is not None:
+            return self.ounces
+        from app.measures import parse_volume_to_ounces
+        return tuple(parse_volume_to_ounces(measure) for _, measure in self.pairs)
+
+    @property
+    def ingredient_lines(self):
+        # "1 1/2 oz Vodka" style lines shown on the recommendation and detail pages
+        return [measure + " " + ing for ing, measure in self.pairs]
+
+    def to_dict(self):
+        # Back to the API's shape, for callers that still expect the raw record
+        detail = {
+            "idDrink": self.id,
+            "strDrink": self.name,
+            "strInstructions": self.instructions,
+            "strDrinkThumb": self.thumb,
+            "strCategory": self.category,
+            "strAlcoholic": self.alcoholic,
+            "strGlass": self.glass,
+        }
+        for n in range(1, 16):
+            ing, measure = self.pairs[n - 1] if n <= len(self.pairs) else (None, None)
+            detail[f"strIngredient{n}"] = ing
+            detail[f"strMeasure{n}"] = measure or None
+        return detail
+
+    def __repr__(self):
+        return f"Drink({self.id!r}, {self.name!r})"
+
+
+def as_drink(drink):
+    # Accept either a Drink or a raw API dict
+    if isinstance(drink, Drink):
+        return drink
+    return Drink.from_api(drink)
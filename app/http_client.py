@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared client for every upstream API call (TheCocktailDB and YouTube).
+# One pooled session keeps connections alive between requests, and get_json()
+# is the one place where retries, backoff and error classification happen.
+
+DEFAULT_TIMEOUT = 10
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.5  # seconds before the first retry, doubled on every attempt
+BACKOFF_MAX = 8.0
+POOL_SIZE = 16
+
+RETRYABLE_KINDS = {"timeout", "network", "rate_limited", "server_error"}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class UpstreamError(Exception):
+    # kind is one of: timeout, network, rate_limited, server_error, http_error, bad_response
+
+    def __init__(self, kind, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.kind = kind
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.kind in RETRYABLE_KINDS
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def parse_retry_after(value):
+    # Retry-After is either a number of seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_response(response):
+    """Return an UpstreamError for a failed response, or None if it succeeded."""
+    status = response.status_code
+    if status == 200:
+        return None
+    if status == 429:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        return UpstreamError("rate_limited", "Rate limited (429)", status, retry_after)
+    if status >= 500:
+        return UpstreamError("server_error", f"API returned status {status}", status)
+    return UpstreamError("http_error", f"API returned status {status}", status)
+
+
+def classify_exception(exc):
+    if isinstance(exc, requests.exceptions.Timeout):
+        return UpstreamError("timeout", f"Timeout: {exc}")
+    return UpstreamError("network", f"Network error: {exc}")
+
+
+def retry_delay(attempt, retry_after=None):
+    # Honour the server's Retry-After, otherwise exponential backoff with jitter
+    # so concurrent workers don't all retry at the same moment
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def get_json(url, params=None, timeout=DEFAULT_TIMEOUT, limiter=None, retries=MAX_RETRIES, sleep=time.sleep):
+    """GET `url` and return the decoded JSON body, raising UpstreamError when it can't."""
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = get_session().get(url, params=params, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            error = classify_exception(e)
+        else:
+            error = classify_response(response)
+            if error is None:
+                try:
+                    return response.json()
+                except ValueError:
+                    raise UpstreamError("bad_response", "API returned invalid JSON", response.status_code)
+
+        if not error.retryable or attempt == retries:
+            raise error
+        sleep(retry_delay(attempt, error.retry_after))
@@ -0,0 +1,93 @@
+import re
+from functools import lru_cache
+
+# Measure parsing for recipe amounts like "1 1/2 oz", "50ml", "2 tsp", "3 cubes ice".
+#
+# The text is tokenized once with a single compiled pattern (ranges, fractions,
+# decimals and unit words), quantities are summed and converted with UNIT_OUNCES.
+# Results are memoized on the normalized text since the same few hundred measure
+# strings repeat across the whole catalog.
+
+# Fluid ounces per unit
+UNIT_OUNCES = {
+    "oz": 1.0, "ounce": 1.0, "ounces": 1.0, "fl": 1.0,
+    "ml": 0.0338,
+    "cl": 0.338,
+    "dl": 3.38,
+    "l": 33.8, "liter": 33.8, "litre": 33.8, "liters": 33.8, "litres": 33.8,
+    "tsp": 1 / 6, "teaspoon": 1 / 6, "teaspoons": 1 / 6,
+    "tbsp": 0.5, "tblsp": 0.5, "tablespoon": 0.5, "tablespoons": 0.5,
+    "dash": 1 / 32, "dashes": 1 / 32,
+    "jigger": 1.5, "jiggers": 1.5,
+    "shot": 1.5, "shots": 1.5,
+    "cup": 8.0, "cups": 8.0,
+    "pint": 16.0, "pints": 16.0,
+}
+
+GARNISH_PATTERN = re.compile(r"garnish|wedge|slice|twist|wheel|peel|sprig|leaf|leaves")
+
+TOKEN_PATTERN = re.compile(
+    r"(?P<whole>\d+)\s*-\s*(?P<mixed_num>\d+)\s*/\s*(?P<mixed_den>\d+)"  # "1-1/2 oz": a mixed number, not a range
+    r"|(?P<range>\d+(?:[.,]\d+)?)\s*-\s*\d+(?:[.,]\d+)?"  # "2-3 oz": use the lower bound
+    r"|(?P<num>\d+)\s*/\s*(?P<den>\d+)"                    # "1/2"
+    r"|(?P<number>\d+,\d+|\d*\.\d+|\d+)"                   # "1", "1.5", "1,5", ".5"
+    r"|(?P<word>[a-z]+)"                             # units and everything else
+)
+
+DEFAULT_ICE_OZ = 4.0
+OZ_PER_ICE_CUBE = 1.5
+
+
+def normalize_measure(measure_text):
+    return " ".join(measure_text.lower().split())
+
+
+@lru_cache(maxsize=4096)
+def parse_normalized_measure(text):
+    # Garnishes aren't a measurable amount
+    if not text or GARNISH_PATTERN.search(text):
+        return 0.0
+
+    total = 0.0
+    unit = None
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.group("whole") is not None:
+            den = float(match.group("mixed_den"))
+            total += float(match.group("whole")) + (float(match.group("mixed_num")) / den if den else 0.0)
+        elif match.group("range") is not None:
+            total += float(match.group("range").replace(",", "."))
+        elif match.group("num") is not None:
+            den = float(match.group("den"))
+            if den:
+                total += float(match.group("num")) / den
+        elif match.group("number") is not None:
+            total += float(match.group("number").replace(",", "."))
+        elif unit is None:
+            unit = UNIT_OUNCES.get(match.group("word"))
+
+    # Special handling for ice: amounts are counts of cubes or a rough scoop
+    if "ice" in text or "cube" in text:
+        if total == 0:
+            total = DEFAULT_ICE_OZ
+        if "cube" in text:
+            if total < 2:
+                total = 3 * OZ_PER_ICE_CUBE  # Assume 3 cubes if no number given
+            else:
+                total = total * OZ_PER_ICE_CUBE
+
+    if total == 0:
+        return 0.0
+    if unit is not None:
+        return total * unit
+    return total
+
+
+def parse_volume_to_ounces(measure_text):
+    if not measure_text:
+        return 0.0
+    return parse_normalized_measure(normalize_measure(measure_text))
+
+
+def parse_measures(measure_texts):
+    # Batch version: {measure_text: ounces} for every distinct text, parsed in one pass
+    return {text: parse_volume_to_ounces(text) for text in set(measure_texts)}
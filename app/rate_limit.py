@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Upstream rate limiting. TokenBucket limits this process; SharedTokenBucket keeps
+# the bucket in a small SQLite file so every worker process on the host draws
+# from the same budget. Both keep track of how long callers were made to wait.
+
+DEFAULT_RATE_LIMIT_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "ratelimit.db")
+
+
+class TokenBucket:
+    # Classic token bucket: `rate` tokens are added per second, up to `capacity`.
+    # Every upstream request takes one token and waits if the bucket is empty.
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _take(self, tokens):
+        # Caller holds self.lock. Returns the number of tokens left (negative means owed).
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= tokens
+        return self.tokens
+
+    def reserve(self, tokens=1):
+        """Take `tokens` now and return how many seconds the caller has to wait before using them."""
+        with self.lock:
+            left = self._take(tokens)
+            wait = 0.0 if left >= 0 else -left / self.rate
+            self.requests += 1
+            if wait > 0:
+                self.delayed += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            return wait
+
+    def acquire(self, tokens=1):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def stats(self):
+        # Queueing delay seen by requests from this process
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "requests": self.requests,
+            "delayed": self.delayed,
+            "total_wait": round(self.total_wait, 3),
+            "max_wait": round(self.max_wait, 3),
+            "avg_wait": round(self.total_wait / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+class SharedTokenBucket(TokenBucket):
+    # TokenBucket whose state is a row in a SQLite file, updated in an IMMEDIATE
+    # transaction so concurrent workers can't spend the same token twice.
+    # If the file can't be used the bucket falls back to limiting this process only.
+
+    def __init__(self, name, rate, capacity=None, path=None, clock=time.time, sleep=time.sleep):
+        super().__init__(rate, capacity, clock, sleep)
+        self.name = name
+        self.path = path
+        self.local = threading.local()
+
+    def get_path(self):
+        return self.path or os.environ.get("RATE_LIMIT_DB_PATH") or DEFAULT_RATE_LIMIT_DB_PATH
+
+    def connection(self):
+        path = self.get_path()
+        connections = getattr(self.local, "connections", None)
+        if connections is None:
+            connections = self.local.connections = {}
+        conn = connections.get(path)
+        if conn is None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)")
+            connections[path] = conn
+        return conn
+
+    def _take(self, tokens):
+        conn = None
+        try:
+            conn = self.connection()
+            conn.execute("BEGIN IMMEDIATE")
+            now = self.clock()
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            available, updated_at = row if row else (self.capacity, now)
+            available = min(self.capacity, available + max(0.0, now - updated_at) * self.rate) - tokens
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (self.name, available, now),
+            )
+            conn.execute("COMMIT")
+            return available
+        except (sqlite3.Error, OSError) as e:
+            if conn is not None and conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            print(f"Shared rate limiter unavailable ({e}), limiting this process only")
+            return super()._take(tokens)
+
+
+def create_limiter(name, rate, capacity=None, backend=None):
+    # RATE_LIMIT_BACKEND=memory limits each process separately; the default
+    # shares the budget between all processes on the host
+    backend = backend or os.environ.get("RATE_LIMIT_BACKEND", "sqlite")
+    if backend == "memory":
+        return TokenBucket(rate, capacity)
+    return SharedTokenBucket(name, rate, capacity)
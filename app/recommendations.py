@@ -0,0 +1,213 @@
+import base64
+import heapq
+import json
+
+from app import catalog
+from app.cache import FutureTimeoutError, SingleFlight, TTLCache
+from app.cocktails import (
+    MixerMatcher, RecommendationStream, build_recommendation, fetch_drinks_many, get_candidate_ids,
+    iter_recommendations, recommendation_sort_key, sort_recommendations,
+)
+from app.scoring import rank_catalog
+
+# Server-side cache of finished searches. Popular searches ("vodka" + "orange
+# juice") are computed once, and identical searches that arrive while one is
+# still running wait for it instead of starting their own (single-flight).
+#
+# The cache holds every matching drink as a lightweight dict; pages of
+# PAGE_SIZE are picked from it with a heap and addressed with opaque cursors.
+
+PAGE_SIZE = 12
+RESULT_CACHE_TTL = 10 * 60
+EMPTY_RESULT_CACHE_TTL = 60
+# How long an identical search waits on the one already running before computing its own
+FLIGHT_WAIT_TIMEOUT = 30
+
+recommendation_cache = TTLCache(maxsize=512)
+recommendation_flights = SingleFlight()
+
+
+class RecommendationAborted(Exception):
+    pass
+
+
+def normalize_prefs(user_prefs):
+    # Sorted, deduplicated, lowercased alcohols and mixers
+    return {
+        "alcohol_types": sorted({a.strip().lower() for a in user_prefs["alcohol_types"] if a.strip()}),
+        "mixers": sorted({m.strip().lower() for m in user_prefs["mixers"] if m.strip()}),
+    }
+
+
+def preference_key(user_prefs):
+    # Cache key for a search. max_results isn't part of it: the cache holds the
+    # full ranked list and every caller slices its own page or top-k on read.
+    prefs = normalize_prefs(user_prefs)
+    return (tuple(prefs["alcohol_types"]), tuple(prefs["mixers"]))
+
+
+def compute_recommendations(user_prefs):
+    # Every matching drink, unsorted. Scores the whole local catalog when it's
+    # available, otherwise samples from the API.
+    if catalog.is_populated():
+        return rank_catalog(user_prefs)
+    return list(iter_recommendations(user_prefs))
+
+
+def cache_recommendations(key, recs):
+    recommendation_cache.store(key, recs, RESULT_CACHE_TTL, 0, EMPTY_RESULT_CACHE_TTL)
+
+
+def get_cached_recommendations(key):
+    return recommendation_cache.get(key)
+
+
+def compute_and_cache(key, user_prefs):
+    recs = compute_recommendations(normalize_prefs(user_prefs))
+    cache_recommendations(key, recs)
+    return recs
+
+
+def get_recommendations(user_prefs):
+    key = preference_key(user_prefs)
+    recs = get_cached_recommendations(key)
+    if recs is not None:
+        return recs
+
+    compute = lambda: compute_and_cache(key, user_prefs)
+    try:
+        return recommendation_flights.do(key, compute, timeout=FLIGHT_WAIT_TIMEOUT)
+    except RecommendationAborted:
+        # The search we were waiting on was a stream whose client went away
+        return recommendation_flights.do(key, compute, timeout=FLIGHT_WAIT_TIMEOUT)
+
+
+def stream_recommendations(user_prefs, page_size=PAGE_SIZE):
+    """Return (cached_results, stream): exactly one of them is not None.
+
+    The stream, if any, leads the single-flight for this search: identical
+    searches arriving while it renders wait for its final results. The caller
+    must close() the stream when the response ends (Response.call_on_close),
+    in case the template never got to iterate over it.
+    """
+    key = preference_key(user_prefs)
+    recs = get_cached_recommendations(key)
+    if recs is not None:
+        return recs, None
+
+    future, is_leader = recommendation_flights.claim(key)
+    if not is_leader:
+        try:
+            return future.result(timeout=FLIGHT_WAIT_TIMEOUT), None
+        except RecommendationAborted:
+            return get_recommendations(user_prefs), None
+        except FutureTimeoutError:
+            recommendation_flights.timeouts += 1
+            return compute_and_cache(key, user_prefs), None
+
+    def on_done(recs):
+        if recs is None:
+            recommendation_flights.finish(key, error=RecommendationAborted())
+        else:
+            cache_recommendations(key, recs)
+            recommendation_flights.finish(key, recs)
+
+    # The stream's final() is its first page
+    return None, RecommendationStream(normalize_prefs(user_prefs), page_size, on_done=on_done)
+
+
+def encode_cursor(result):
+    # Opaque ?cursor= value pointing just after `result` in the ranking
+    key = json.dumps(recommendation_sort_key(result), separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    # The sort key a cursor points after, or None (first page) for a missing or bad cursor
+    if not cursor:
+        return None
+    try:
+        score, name, drink_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return (int(score), str(name), str(drink_id))
+    except (ValueError, TypeError):
+        return None
+
+
+def paginate(recs, cursor=None, page_size=PAGE_SIZE):
+    """Return (page, next_cursor) for the results after `cursor`.
+
+    Only page_size + 1 results are kept in a heap, so the cost doesn't depend on
+    sorting every candidate, and the (-match_score, name) order stays the same
+    across pages. next_cursor is None on the last page.
+    """
+    after = decode_cursor(cursor)
+    candidates = recs if after is None else (r for r in recs if recommendation_sort_key(r) > after)
+    page = heapq.nsmallest(page_size + 1, candidates, key=recommendation_sort_key)
+    if len(page) > page_size:
+        return page[:page_size], encode_cursor(page[page_size - 1])
+    return page, None
+
+
+def compute_batch_from_api(prefs_list):
+    # Score every preference set against one shared candidate pool: each
+    # alcohol's filter list and each drink's details are fetched once per batch
+    alcohols = sorted({alc for prefs in prefs_list for alc in prefs["alcohol_types"]})
+    ids_by_alcohol = {alc: get_candidate_ids([alc]) for alc in alcohols}
+    pool_ids = list(dict.fromkeys(drink_id for ids in ids_by_alcohol.values() for drink_id in ids))
+    drinks = dict(zip(pool_ids, fetch_drinks_many(pool_ids)))
+
+    batch = []
+    for prefs in prefs_list:
+        matcher = MixerMatcher(prefs["mixers"])
+        drink_ids = dict.fromkeys(drink_id for alc in prefs["alcohol_types"] for drink_id in ids_by_alcohol[alc])
+        results = (build_recommendation(drink_id, drinks[drink_id], matcher) for drink_id in drink_ids)
+        batch.append([result for result in results if result])
+    return batch
+
+
+def most_guests(batch, max_results):
+    # Drinks that match the most preference sets, then the highest combined score
+    guests = {}
+    for guest, recs in enumerate(batch):
+        for rec in recs:
+            entry = guests.setdefault(rec["id"], {"id": rec["id"], "name": rec["name"], "thumb": rec["thumb"], "guests": [], "total_score": 0})
+            entry["guests"].append(guest)
+            entry["total_score"] += rec["match_score"]
+    return heapq.nsmallest(max_results, guests.values(), key=lambda e: (-len(e["guests"]), -e["total_score"], e["name"], e["id"]))
+
+
+def recommend_batch(prefs_list, max_results=10):
+    """Recommendations for many preference sets at once (e.g. every guest of an event).
+
+    Returns {"results": [top max_results for each preference set, in order],
+    "most_guests": [drinks that satisfy the most sets, with their indexes]}.
+    Each set's full results go through the same cache as single searches.
+    """
+    prefs_list = [normalize_prefs(prefs) for prefs in prefs_list]
+    keys = [preference_key(prefs) for prefs in prefs_list]
+    batch = [get_cached_recommendations(key) for key in keys]
+
+    # Preference sets not cached yet, once each even if several guests share them
+    missing = {keys[i]: prefs_list[i] for i, recs in enumerate(batch) if recs is None}
+    if missing:
+        if catalog.is_populated():
+            computed = [rank_catalog(prefs) for prefs in missing.values()]
+        else:
+            computed = compute_batch_from_api(list(missing.values()))
+        for key, recs in zip(missing, computed):
+            cache_recommendations(key, recs)
+        computed = dict(zip(missing, computed))
+        batch = [recs if recs is not None else computed[key] for key, recs in zip(keys, batch)]
+
+    return {
+        "results": [sort_recommendations(recs, max_results) for recs in batch],
+        "most_guests": most_guests(batch, max_results),
+    }
+
+
+def stats():
+    return {
+        "recommendation_cache": recommendation_cache.stats(),
+        "coalesced_searches": recommendation_flights.coalesced,
+        "flight_wait_timeouts": recommendation_flights.timeouts,
+    }
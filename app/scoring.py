@@ -0,0 +1,180 @@
+import threading
+
+import numpy as np
+
+from app import catalog
+from app.cocktails import INGREDIENT_ALIASES, MixerMatcher
+
+# Whole-catalog recommendations. Instead of looking at the first 20 drinks per
+# alcohol, every drink in the local catalog is scored at once: the catalog is
+# encoded as a boolean drink x ingredient matrix, the alcohol filter and mixer
+# scores are matrix operations, and only the top-k drinks are hydrated.
+
+
+class CatalogMatrix:
+
+    def __init__(self, drinks):
+        # drinks: {drink_id: (name, thumb, [ingredient_key, ...])}
+        self.drink_ids = list(drinks)
+        self.names = [drinks[drink_id][0] for drink_id in self.drink_ids]
+        self.thumbs = [drinks[drink_id][1] for drink_id in self.drink_ids]
+        self.ingredients = sorted({key for _, _, keys in drinks.values() for key in keys})
+        self.ingredient_index = {key: i for i, key in enumerate(self.ingredients)}
+
+        self.matrix = np.zeros((len(self.drink_ids), len(self.ingredients)), dtype=bool)
+        for row, drink_id in enumerate(self.drink_ids):
+            for key in drinks[drink_id][2]:
+                self.matrix[row, self.ingredient_index[key]] = True
+
+        # Position of each drink when sorted by name, used to break score ties
+        order = sorted(range(len(self.names)), key=lambda i: self.names[i])
+        self.name_rank = np.empty(len(self.names), dtype=np.int64)
+        self.name_rank[order] = np.arange(len(self.names))
+
+    def __len__(self):
+        return len(self.drink_ids)
+
+    def alcohol_mask(self, alcohols):
+        columns = [self.ingredient_index[a] for a in (alc.strip().lower() for alc in alcohols) if a in self.ingredient_index]
+        if not columns:
+            return np.zeros(len(self.drink_ids), dtype=bool)
+        return self.matrix[:, columns].any(axis=1)
+
+    def mixer_scores(self, mixers):
+        # For each mixer, the ingredient columns that satisfy it (same rules as
+        # get_mixer_match_score), then one matrix product gives drink x mixer hits
+        matcher = MixerMatcher(mixers)
+        if not matcher.mixers:
+            return np.zeros(len(self.drink_ids), dtype=np.int64)
+        mixer_columns = np.zeros((len(self.ingredients), len(matcher.mixers)), dtype=np.int32)
+        for col, key in enumerate(self.ingredients):
+            for mixer_index in matcher.matches_for(key):
+                mixer_columns[col, mixer_index] = 1
+        hits = self.matrix.astype(np.int32) @ mixer_columns
+        return (hits > 0).sum(axis=1)
+
+    def covered_columns(self, names):
+        # Ingredient columns the user has, by exact (already expanded) name
+        covered = np.zeros(len(self.ingredients), dtype=bool)
+        for col, key in enumerate(self.ingredients):
+            covered[col] = key in names
+        return covered
+
+    def missing_counts(self, covered):
+        # How many of each drink's ingredients are not covered
+        return self.matrix[:, ~covered].sum(axis=1)
+
+    def top_k(self, alcohols, mixers, k):
+        """Row indexes and scores of the best k drinks, ordered by (-match_score, name)."""
+        scores = self.mixer_scores(mixers)
+        mask = self.alcohol_mask(alcohols)
+        if mixers:
+            mask &= scores > 0
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0 or k <= 0:
+            return [], []
+        # Higher score first, then alphabetical: a single integer sort key
+        sort_key = -scores[candidates] * len(self.drink_ids) + self.name_rank[candidates]
+        if len(candidates) > k:
+            best = np.argpartition(sort_key, k - 1)[:k]
+            candidates, sort_key = candidates[best], sort_key[best]
+        order = np.argsort(sort_key, kind="stable")
+        rows = candidates[order]
+        return rows.tolist(), scores[rows].tolist()
+
+
+_matrix = None
+_matrix_version = None
+_matrix_lock = threading.Lock()
+
+
+def get_catalog_matrix():
+    # Built lazily and rebuilt whenever the catalog is re-synced, from the
+    # mmapped snapshot when there is one. None before the first sync.
+    global _matrix, _matrix_version
+    if not catalog.catalog_exists():
+        return None
+    version = catalog.get_meta("last_synced_at")
+    with _matrix_lock:
+        if _matrix is None or _matrix_version != version:
+            snapshot = catalog.get_snapshot()
+            drinks = snapshot.drink_ingredient_keys() if snapshot else catalog.get_drink_ingredient_keys()
+            _matrix = CatalogMatrix(drinks)
+            _matrix_version = version
+        return _matrix
+
+
+def rank_catalog(user_prefs, max_results=None):
+    # Lightweight results (no drink details needed) straight from the matrix,
+    # best first; every matching drink when max_results is None
+    matrix = get_catalog_matrix()
+    if matrix is None:
+        return []
+    k = len(matrix) if max_results is None else max_results
+    rows, scores = matrix.top_k(user_prefs["alcohol_types"], user_prefs["mixers"], k)
+    return [
+        {"name": matrix.names[row], "id": matrix.drink_ids[row], "thumb": matrix.thumbs[row], "match_score": score}
+        for row, score in zip(rows, scores)
+    ]
+
+
+# Assumed to be on every shelf for "what can I make?" (exact names only:
+# having water doesn't mean having tonic water)
+PANTRY_STAPLES = {"ice", "water"}
+
+# A bottle of the generic spirit stands in for these styles of it. Only what's
+# listed here counts; "beer" doesn't cover "ginger beer".
+SPIRIT_FAMILIES = {
+    "rum": ["light rum", "dark rum", "white rum", "gold rum", "spiced rum", "anejo rum", "añejo rum", "jamaican rum", "151 proof rum"],
+    "tequila": ["blanco tequila", "silver tequila", "white tequila", "gold tequila", "reposado tequila", "anejo tequila", "añejo tequila"],
+    "whiskey": ["whisky", "blended whiskey", "irish whiskey", "rye whiskey", "bourbon", "scotch", "blended scotch"],
+    "whisky": ["whiskey", "blended whiskey", "irish whiskey", "rye whiskey", "bourbon", "scotch", "blended scotch"],
+    "gin": ["dry gin", "london dry gin"],
+    "vermouth": ["dry vermouth", "sweet vermouth"],
+}
+
+
+def normalize_inventory(items):
+    # Lowercased ingredient names plus whatever they stand for in INGREDIENT_ALIASES,
+    # in either direction like get_mixer_match_score ("coke" also covers "cola"),
+    # and the styles a generic spirit covers in SPIRIT_FAMILIES
+    names = set()
+    for item in items:
+        clean = " ".join(item.lower().split())
+        if not clean:
+            continue
+        names.add(clean)
+        names.update(INGREDIENT_ALIASES.get(clean, []))
+        names.update(name for name, aliases in INGREDIENT_ALIASES.items() if clean in aliases)
+        names.update(SPIRIT_FAMILIES.get(clean, []))
+    return names
+
+
+def find_makeable_drinks(inventory, max_missing=1, max_results=50):
+    """Drinks in the catalog that can be made from `inventory`.
+
+    Returns {"exact": [...], "missing": [...]}: drinks needing nothing else, and
+    drinks missing 1..max_missing ingredients (fewest missing first), each as
+    {"id", "name", "thumb", "missing": [ingredient, ...]}.
+    """
+    matrix = get_catalog_matrix()
+    if matrix is None:
+        return {"exact": [], "missing": []}
+    covered = matrix.covered_columns(normalize_inventory(inventory) | PANTRY_STAPLES)
+    missing = matrix.missing_counts(covered)
+    has_recipe = matrix.matrix.any(axis=1)
+    rows = np.flatnonzero((missing <= max_missing) & has_recipe)
+    rows = rows[np.lexsort((matrix.name_rank[rows], missing[rows]))]
+
+    results = {"exact": [], "missing": []}
+    for row in rows.tolist():
+        group = results["exact"] if missing[row] == 0 else results["missing"]
+        if len(group) >= max_results:
+            continue
+        group.append({
+            "id": matrix.drink_ids[row],
+            "name": matrix.names[row],
+            "thumb": matrix.thumbs[row],
+            "missing": [matrix.ingredients[col] for col in np.flatnonzero(matrix.matrix[row] & ~covered).tolist()],
+        })
+    return results
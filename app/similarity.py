@@ -0,0 +1,66 @@
+import numpy as np
+
+from app import catalog
+from app.cocktails import get_cup_proportions
+
+# Offline "similar drinks" index, built after each catalog sync.
+#
+# Each drink is a vector over ingredients weighted by its share of a standardized
+# cup (so a Screwdriver is mostly orange juice, a Vodka Martini mostly vodka).
+# Ingredients without a measurable volume (garnishes, solids, unmeasured dashes)
+# still count with a small weight; ice doesn't count at all. Cosine similarity
+# between all pairs is one matrix product, and the top neighbours of every drink
+# are stored in the catalog so the detail page only does an indexed lookup.
+
+UNMEASURED_WEIGHT = 0.05
+NEIGHBOURS = 10
+
+
+def ingredient_weights(drink):
+    weights = {key: UNMEASURED_WEIGHT for key in drink.ingredient_keys}
+    for ing, fraction, fixed_oz in get_cup_proportions(drink):
+        key = ing.lower()
+        if key != "ice":
+            weights[key] = max(weights.get(key, 0), fraction + fixed_oz / 16.0)
+    weights.pop("ice", None)
+    return weights
+
+
+def nearest_neighbours(drinks, k=NEIGHBOURS):
+    """{drink_id: [(similar_id, cosine), ...]} with the k most similar drinks, best first."""
+    drink_weights = [ingredient_weights(drink) for drink in drinks]
+    ingredients = sorted({key for weights in drink_weights for key in weights})
+    column = {key: i for i, key in enumerate(ingredients)}
+
+    vectors = np.zeros((len(drinks), len(ingredients)))
+    for row, weights in enumerate(drink_weights):
+        for key, weight in weights.items():
+            vectors[row, column[key]] = weight
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1.0
+    vectors /= norms[:, None]
+
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, -1.0)
+
+    neighbours = {}
+    k = min(k, len(drinks) - 1)
+    for row, drink in enumerate(drinks):
+        if k <= 0:
+            neighbours[drink.id] = []
+            continue
+        scores = similarity[row]
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        neighbours[drink.id] = [(drinks[i].id, round(float(scores[i]), 4)) for i in best.tolist() if scores[i] > 0]
+    return neighbours
+
+
+def build_similarity_index(db_path=None):
+    drinks = catalog.get_all_drinks(db_path)
+    catalog.save_similar_drinks(nearest_neighbours(drinks), db_path)
+    return len(drinks)
+
+
+if __name__ == "__main__":
+    print(f"Similarity index built for {build_similarity_index()} drinks")
@@ -0,0 +1,236 @@
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+
+import numpy as np
+
+from app.drink import Drink
+
+# Read-only binary snapshot of the catalog for fast worker startup.
+#
+# Written once after a catalog sync (python -m app.catalog) and opened by every
+# worker with mmap, so the pages are shared between processes instead of each
+# worker loading the catalog from SQLite/JSON into its own memory. Nothing is
+# read until a drink is asked for.
+#
+# Layout (little-endian, sections 8-byte aligned):
+#   header       magic, string/drink/pair counts, blob size, catalog version
+#   string table u32 offsets[n_strings + 1] into a UTF-8 blob; every name, id,
+#                ingredient and measure is stored once and referred to by index
+#   drinks       DRINK_DTYPE records, ingredients are pairs[first_pair:first_pair + pair_count]
+#   pairs        PAIR_DTYPE records with the measure already parsed to ounces, so
+#                cup standardization doesn't re-parse measure strings
+#   id order     drink indexes sorted by id, for binary search
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "catalog.snapshot")
+
+MAGIC = b"RSCSNAP3"
+HEADER = struct.Struct("<8sIIIII")  # magic, n_strings, n_drinks, n_pairs, blob_size, version_size
+NO_STRING = 0xFFFFFFFF
+
+DRINK_DTYPE = np.dtype([
+    ("id", "<u4"), ("name", "<u4"), ("thumb", "<u4"), ("instructions", "<u4"),
+    ("category", "<u4"), ("alcoholic", "<u4"), ("glass", "<u4"),
+    ("first_pair", "<u4"), ("pair_count", "<u4"),
+])
+PAIR_DTYPE = np.dtype([("ingredient", "<u4"), ("key", "<u4"), ("measure", "<u4"), ("ounces", "<f8")])
+
+
+def get_snapshot_path():
+    return os.environ.get("CATALOG_SNAPSHOT_PATH") or DEFAULT_SNAPSHOT_PATH
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def write_snapshot(drinks, version, path=None, ounces=None):
+    """Write Drinks to a snapshot file. The file is replaced atomically, so
+    workers that still have the old one mapped keep reading it safely.
+
+    ounces is {measure_text: ounces} (catalog.parse_catalog_measures); any
+    measure missing from it is parsed here.
+    """
+    from app.measures import parse_measures
+
+    known = ounces or {}
+    ounces = {**parse_measures(measure for drink in drinks for _, measure in drink.pairs if measure not in known), **known}
+    path = path or get_snapshot_path()
+    strings = []
+    string_index = {}
+
+    def intern(text):
+        if text is None:
+            return NO_STRING
+        index = string_index.get(text)
+        if index is None:
+            index = string_index[text] = len(strings)
+            strings.append(text)
+        return index
+
+    drink_records = np.zeros(len(drinks), dtype=DRINK_DTYPE)
+    pair_records = np.zeros(sum(len(d.pairs) for d in drinks), dtype=PAIR_DTYPE)
+    pair_count = 0
+    for row, drink in enumerate(drinks):
+        drink_records[row] = (
+            intern(drink.id), intern(drink.name), intern(drink.thumb), intern(drink.instructions),
+            intern(drink.category), intern(drink.alcoholic), intern(drink.glass),
+            pair_count, len(drink.pairs),
+        )
+        for (ing, measure), key in zip(drink.pairs, drink.ingredient_keys):
+            pair_records[pair_count] = (intern(ing), intern(key), intern(measure), ounces[measure])
+            pair_count += 1
+
+    encoded = [text.encode("utf-8") for text in strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    string_offsets[1:] = np.cumsum([len(b) for b in encoded]) if encoded else []
+    blob = b"".join(encoded)
+    id_order = np.array(sorted(range(len(drinks)), key=lambda row: drinks[row].id), dtype="<u4")
+    version_bytes = (version or "").encode("utf-8")
+
+    sections = [string_offsets.tobytes(), blob, drink_records.tobytes(), pair_records.tobytes(), id_order.tobytes()]
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(strings), len(drinks), len(pair_records), len(blob), len(version_bytes)))
+        f.write(version_bytes)
+        for section in sections:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(section)
+    os.replace(tmp_path, path)
+    return path
+
+
+class CatalogSnapshot:
+    # Lazily mmapped view of a snapshot file. Strings are decoded on demand.
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.buffer = None
+
+    def _open(self):
+        with self.lock:
+            if self.buffer is not None:
+                return
+            with open(self.path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, n_strings, n_drinks, n_pairs, blob_size, version_size = HEADER.unpack_from(buffer, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a catalog snapshot")
+            offset = HEADER.size
+            self._version = bytes(buffer[offset:offset + version_size]).decode("utf-8")
+            offset = _align(offset + version_size)
+            self.string_offsets = np.frombuffer(buffer, dtype="<u4", count=n_strings + 1, offset=offset)
+            offset = _align(offset + self.string_offsets.nbytes)
+            self.blob_offset = offset
+            offset = _align(offset + blob_size)
+            self.drinks = np.frombuffer(buffer, dtype=DRINK_DTYPE, count=n_drinks, offset=offset)
+            offset = _align(offset + self.drinks.nbytes)
+            self.pairs = np.frombuffer(buffer, dtype=PAIR_DTYPE, count=n_pairs, offset=offset)
+            offset = _align(offset + self.pairs.nbytes)
+            self.id_order = np.frombuffer(buffer, dtype="<u4", count=n_drinks, offset=offset)
+            self.buffer = buffer
+
+    @property
+    def version(self):
+        self._open()
+        return self._version
+
+    def __len__(self):
+        self._open()
+        return len(self.drinks)
+
+    def string(self, index):
+        if index == NO_STRING:
+            return None
+        start = self.blob_offset + int(self.string_offsets[index])
+        end = self.blob_offset + int(self.string_offsets[index + 1])
+        return self.buffer[start:end].decode("utf-8")
+
+    def find(self, drink_id):
+        """Row of drink_id, or None."""
+        self._open()
+        drink_id = str(drink_id)
+        id_at = lambda i: self.string(int(self.drinks[int(self.id_order[i])]["id"]))
+        lo = bisect_left(range(len(self.id_order)), drink_id, key=id_at)
+        if lo < len(self.id_order) and id_at(lo) == drink_id:
+            return int(self.id_order[lo])
+        return None
+
+    def drink_pairs(self, row):
+        record = self.drinks[row]
+        first = int(record["first_pair"])
+        return self.pairs[first:first + int(record["pair_count"])]
+
+    def get_drink(self, drink_id):
+        row = self.find(drink_id)
+        if row is None:
+            return None
+        record = self.drinks[row]
+        pairs = self.drink_pairs(row)
+        return Drink(
+            id=self.string(int(record["id"])),
+            name=self.string(int(record["name"])),
+            instructions=self.string(int(record["instructions"])) or "",
+            thumb=self.string(int(record["thumb"])),
+            category=self.string(int(record["category"])),
+            alcoholic=self.string(int(record["alcoholic"])),
+            glass=self.string(int(record["glass"])),
+            pairs=[(self.string(int(p["ingredient"])), self.string(int(p["measure"]))) for p in pairs],
+            ounces=pairs["ounces"].tolist(),
+        )
+
+    def drink_ingredient_keys(self):
+        # Same shape as catalog.get_drink_ingredient_keys()
+        self._open()
+        keys = {}
+        for row in range(len(self.drinks)):
+            record = self.drinks[row]
+            keys[self.string(int(record["id"]))] = (
+                self.string(int(record["name"])),
+                self.string(int(record["thumb"])),
+                [self.string(int(p["key"])) for p in self.drink_pairs(row)],
+            )
+        return keys
+
+
+_snapshot = None
+_snapshot_stat = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    # The worker's shared snapshot, or None if there isn't one. Reopened when
+    # a new sync replaces the file. The old mapping isn't closed here, since
+    # another thread may still be reading it (and numpy views of an mmap keep it
+    # from closing); nothing else keeps a reference to it, so it's unmapped as
+    # soon as the last reader lets go.
+    global _snapshot, _snapshot_stat
+    path = get_snapshot_path()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_ino, stat.st_mtime_ns)
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot_stat != key:
+            _snapshot = CatalogSnapshot(path)
+            _snapshot_stat = key
+        return _snapshot
+
+
+def get_current_snapshot(version):
+    # The snapshot, only if it was written from catalog `version` (its last_synced_at)
+    snapshot = get_snapshot()
+    if snapshot is None or version is None:
+        return None
+    try:
+        return snapshot if snapshot.version == version else None
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Ignoring unreadable catalog snapshot: {e}")
+        return None
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+import httpx
+from app import cocktails
+from app.async_client import get_json_async, get_or_load_async, fetch_drink_async, fetch_drinks_many_async
+
+def make_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def test_get_json_async_retries_rate_limited(monkeypatch):
+    calls = []
+    def handler(request):
+        calls.append(request.url.params["i"])
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"drinks": []})
+
+    async def run():
+        async with make_client(handler) as client:
+            return await get_json_async(client, "https://example.com/filter.php", params={"i": "vodka"})
+    assert asyncio.run(run()) == {"drinks": []}
+    assert calls == ["vodka", "vodka"]
+
+def test_get_json_async_reserves_off_the_event_loop():
+    class Limiter:
+        def reserve(self):
+            self.thread = threading.current_thread()
+            return 0
+    limiter = Limiter()
+
+    async def run():
+        async with make_client(lambda request: httpx.Response(200, json={})) as client:
+            return await get_json_async(client, "https://example.com/list.php", limiter=limiter)
+    assert asyncio.run(run()) == {}
+    assert limiter.thread is not threading.main_thread()
+
+def test_fetch_drinks_many_async_uses_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("CATALOG_DB_PATH", str(tmp_path / "missing.db"))
+    cocktails.catalog_cache.clear()
+    requested = []
+    def handler(request):
+        drink_id = request.url.params["i"]
+        requested.append(drink_id)
+        if drink_id == "0":
+            return httpx.Response(200, json={"drinks": None})
+        return httpx.Response(200, json={"drinks": [{"idDrink": drink_id, "strDrink": f"Drink {drink_id}", "strIngredient1": "Gin"}]})
+
+    async def run():
+        async with make_client(handler) as client:
+            drinks = await fetch_drinks_many_async(client, ["1", "2", "0"])
+            again = await fetch_drink_async(client, "1")
+            return drinks, again
+    drinks, again = asyncio.run(run())
+    assert [d.name if d else None for d in drinks] == ["Drink 1", "Drink 2", None]
+    assert again.name == "Drink 1"
+    assert sorted(requested) == ["0", "1", "2"]
+    cocktails.catalog_cache.clear()
+
+def test_get_or_load_async_refreshes_stale_entries(monkeypatch):
+    cocktails.catalog_cache.clear()
+    now = [0.0]
+    monkeypatch.setattr(cocktails.catalog_cache, "clock", lambda: now[0])
+    async def load():
+        return ["from upstream"]
+    refreshed = threading.Event()
+    def reload():
+        refreshed.set()
+        return ["refreshed"]
+
+    key = ("filter.php", "test-stale")
+    misses = cocktails.catalog_cache.misses
+    assert asyncio.run(get_or_load_async(key, load, reload, ttl=10, stale_ttl=100)) == ["from upstream"]
+    assert cocktails.catalog_cache.misses == misses + 1
+    now[0] = 50
+    # Stale: served as is while the sync loader refreshes it in the background
+    assert asyncio.run(get_or_load_async(key, load, reload, ttl=10, stale_ttl=100)) == ["from upstream"]
+    assert refreshed.wait(2)
+    for _ in range(100):
+        if cocktails.catalog_cache.get(key) == ["refreshed"]:
+            break
+        time.sleep(0.01)
+    assert cocktails.catalog_cache.get(key) == ["refreshed"]
+    cocktails.catalog_cache.clear()
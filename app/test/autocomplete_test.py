@@ -0,0 +1,22 @@
+from app.autocomplete import IngredientIndex
+
+NAMES = ["Vodka", "Vanilla vodka", "Lime Juice", "Lemon Juice", "Lime", "Tequila", "Triple sec", "Light rum"]
+POPULARITY = {"vodka": 60, "lime juice": 40, "lime": 30, "lemon juice": 45, "tequila": 25, "light rum": 20}
+
+def test_prefix_matches_ranked_by_popularity():
+    index = IngredientIndex(NAMES, POPULARITY)
+    assert [name for name, _ in index.search("li")] == ["Lime Juice", "Lime", "Light rum"]
+    assert index.search("VOD", limit=1) == [("Vodka", 60)]
+
+def test_word_prefix_and_typo_matches():
+    index = IngredientIndex(NAMES, POPULARITY)
+    # Names starting with the query come before names with a later word matching it
+    assert [name for name, _ in index.search("vodka")] == ["Vodka", "Vanilla vodka"]
+    assert [name for name, _ in index.search("juice")] == ["Lemon Juice", "Lime Juice"]
+    assert index.search("tequlia")[0] == ("Tequila", 25)
+    assert index.search("xyz") == []
+
+def test_empty_query_lists_most_popular():
+    index = IngredientIndex(NAMES + ["vodka "], POPULARITY)
+    assert len(index) == len(NAMES)
+    assert [name for name, _ in index.search("", limit=3)] == ["Vodka", "Lemon Juice", "Lime Juice"]
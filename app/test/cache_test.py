@@ -0,0 +1,113 @@
+import threading
+from app.cache import SharedTTLCache, SQLiteCache, TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_get_or_load_caches_until_ttl():
+    clock = FakeClock()
+    cache = TTLCache(clock=clock)
+    calls = []
+    loader = lambda: calls.append(1) or "margarita"
+    assert cache.get_or_load("11007", loader, ttl=10) == "margarita"
+    assert cache.get_or_load("11007", loader, ttl=10) == "margarita"
+    assert len(calls) == 1
+    clock.now = 11
+    cache.get_or_load("11007", loader, ttl=10)
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+def test_stale_entries_are_served_while_refreshing():
+    clock = FakeClock()
+    cache = TTLCache(clock=clock)
+    cache.get_or_load("list", lambda: ["Gin"], ttl=10, stale_ttl=100)
+    clock.now = 50
+    refreshed = threading.Event()
+    def reload():
+        refreshed.set()
+        return ["Gin", "Rum"]
+    assert cache.get_or_load("list", reload, ttl=10, stale_ttl=100) == ["Gin"]
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if cache.get("list") == ["Gin", "Rum"]:
+            break
+        threading.Event().wait(0.01)
+    assert cache.get("list") == ["Gin", "Rum"]
+    assert cache.stats()["stale_hits"] == 1
+
+def test_negative_entries_use_negative_ttl():
+    clock = FakeClock()
+    cache = TTLCache(clock=clock)
+    calls = []
+    loader = lambda: calls.append(1)
+    assert cache.get_or_load("99999", loader, ttl=1000, negative_ttl=5) is None
+    assert cache.get_or_load("99999", loader, ttl=1000, negative_ttl=5) is None
+    assert len(calls) == 1
+    assert cache.stats()["negative_hits"] == 1
+    clock.now = 6
+    cache.get_or_load("99999", loader, ttl=1000, negative_ttl=5)
+    assert len(calls) == 2
+
+def test_lru_eviction_and_errors_are_not_cached():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1, ttl=100)
+    cache.set("b", 2, ttl=100)
+    cache.get("a")
+    cache.set("c", 3, ttl=100)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+    def failing():
+        raise ValueError("upstream down")
+    try:
+        cache.get_or_load("d", failing, ttl=100)
+    except ValueError:
+        pass
+    assert cache.get("d") is None
+
+def test_sqlite_cache_persists_json_values(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache("youtube", path=path)
+    cache.set("margarita", {"video_id": "abc"}, ttl=60)
+    # A second instance (e.g. another worker) sees the same entry
+    assert SQLiteCache("youtube", path=path).get("margarita") == {"video_id": "abc"}
+    assert SQLiteCache("other", path=path).get("margarita") is None
+    cache.set("mojito", {"video_id": None}, ttl=-1)
+    assert cache.get("mojito", "expired") == "expired"
+
+def test_shared_cache_is_seen_by_other_workers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    worker_a = SharedTTLCache("upstream", path=path)
+    worker_b = SharedTTLCache("upstream", path=path)
+    calls = []
+    def loader():
+        calls.append(1)
+        return [{"idDrink": "11000"}]
+    assert worker_a.get_or_load(("filter.php", "vodka"), loader, ttl=100) == [{"idDrink": "11000"}]
+    assert worker_b.get_or_load(("filter.php", "vodka"), loader, ttl=100) == [{"idDrink": "11000"}]
+    assert len(calls) == 1
+    assert len(worker_b) == 1
+    worker_b.set(("list.php",), ["Vodka"], ttl=-1, stale_ttl=100)
+    assert worker_a.get(("list.php",)) is None
+    assert worker_a.get(("list.php",), allow_stale=True) == ["Vodka"]
+
+def test_shared_cache_errors_are_misses(tmp_path):
+    # The cache "directory" is a file, so the database can't be created
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    cache = SharedTTLCache("upstream", path=str(blocker / "cache.db"))
+    calls = []
+    def loader():
+        calls.append(1)
+        return ["Vodka"]
+    assert cache.get_or_load(("list.php",), loader, ttl=100) == ["Vodka"]
+    assert cache.get_or_load(("list.php",), loader, ttl=100) == ["Vodka"]
+    assert len(calls) == 2
+    cache.delete(("list.php",))
+    assert len(cache) == 0
+    assert cache.stats()["backend_errors"] == 5
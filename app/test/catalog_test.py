@@ -0,0 +1,91 @@
+import pytest
+from app import catalog
+from app import cocktails
+
+SCREWDRIVER = {
+    "idDrink": "11000",
+    "strDrink": "Screwdriver",
+    "strDrinkThumb": "https://example.com/screwdriver.jpg",
+    "strInstructions": "Mix in a highball glass with ice.",
+    "strIngredient1": "Vodka",
+    "strMeasure1": "2 oz ",
+    "strIngredient2": "Orange Juice",
+    "strMeasure2": None,
+    "strIngredient3": None,
+}
+
+@pytest.fixture
+def catalog_db(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "catalog.db")
+    monkeypatch.setenv("CATALOG_DB_PATH", db_path)
+    monkeypatch.setenv("CATALOG_SNAPSHOT_PATH", str(tmp_path / "catalog.snapshot"))
+    cocktails.catalog_cache.clear()
+    yield db_path
+    catalog.close_connections()
+    cocktails.catalog_cache.clear()
+
+def test_save_and_get_drink(catalog_db):
+    assert catalog.get_drink("11000") is None
+    catalog.save_drinks([SCREWDRIVER])
+    assert catalog.get_drink("11000")["strDrink"] == "Screwdriver"
+    # Every distinct measure, parsed once (snapshot writes use this)
+    assert catalog.parse_catalog_measures() == {"2 oz": 2.0}
+
+def test_get_drinks_by_ingredient(catalog_db):
+    catalog.save_drinks([SCREWDRIVER])
+    drinks = catalog.get_drinks_by_ingredient(" VODKA ")
+    assert drinks == [{"strDrink": "Screwdriver", "strDrinkThumb": "https://example.com/screwdriver.jpg", "idDrink": "11000"}]
+    assert catalog.get_drinks_by_ingredient("gin") == []
+
+def test_fetch_functions_read_from_catalog(catalog_db, monkeypatch):
+    catalog.save_drinks([SCREWDRIVER])
+    catalog.save_ingredients(["Vodka", "Orange Juice"])
+    catalog.set_meta("last_synced_at", "0")
+    monkeypatch.setattr(cocktails, "request_drink_details", lambda drink_id: pytest.fail("went upstream"))
+    monkeypatch.setattr(cocktails, "request_drinks_by_alcohol", lambda alcohol: pytest.fail("went upstream"))
+
+    assert cocktails.fetch_drink_details("11000")["strDrink"] == "Screwdriver"
+    assert [d["idDrink"] for d in cocktails.fetch_drinks_by_alcohol("vodka")] == ["11000"]
+    assert cocktails.fetch_ingredient_list() == ["Orange Juice", "Vodka"]
+
+def test_compatible_mixers_from_cooccurrence_index(catalog_db):
+    cuba_libre = {"idDrink": "11288", "strDrink": "Cuba Libre", "strIngredient1": "Light rum", "strIngredient2": "Lime", "strIngredient3": "Coca-Cola"}
+    vodka_cola = {"idDrink": "1", "strDrink": "Vodka Cola", "strIngredient1": "Vodka", "strIngredient2": "Coca-Cola"}
+    catalog.save_drinks([SCREWDRIVER, cuba_libre, vodka_cola])
+    assert cocktails.find_compatible_mixers(["vodka"]) is None  # not synced yet
+
+    catalog.build_cooccurrence_index()
+    catalog.set_meta("last_synced_at", "0")
+    assert cocktails.find_compatible_mixers(["vodka"]) == [("coca-cola", 1), ("orange juice", 1)]
+    assert cocktails.find_compatible_mixers(["vodka", "light rum"]) == [("coca-cola", 2), ("lime", 1), ("orange juice", 1)]
+
+    # A drink with both selected alcohols counts once for its other ingredients
+    cocktails.catalog_cache.clear()
+    rum_vodka_cola = {"idDrink": "2", "strDrink": "Rum Vodka Cola", "strIngredient1": "Light rum", "strIngredient2": "Vodka", "strIngredient3": "Coca-Cola"}
+    catalog.save_drinks([rum_vodka_cola])
+    catalog.build_cooccurrence_index()
+    assert catalog.get_cooccurring_ingredients(["vodka", "light rum"]) == [("coca-cola", 3), ("lime", 1), ("orange juice", 1)]
+
+def test_sync_sweeps_by_first_letter_and_resumes(catalog_db, monkeypatch):
+    from app.http_client import UpstreamError
+    requested = []
+    failures = ["s"]
+    def by_letter(letter):
+        requested.append(letter)
+        if letter in failures:
+            failures.remove(letter)
+            raise UpstreamError("rate_limited", "429")
+        return [SCREWDRIVER] if letter == "s" else []
+    monkeypatch.setattr(cocktails, "request_drinks_by_first_letter", by_letter)
+    monkeypatch.setattr(cocktails, "fetch_ingredient_list_from_api", lambda: ["Vodka", "Orange Juice"])
+
+    catalog.sync_catalog()
+    assert len(requested) == len(catalog.FIRST_LETTERS)
+    assert not catalog.is_populated()
+
+    # The second run only asks for the letter that failed
+    requested.clear()
+    assert catalog.sync_catalog() == 1
+    assert requested == ["s"]
+    assert catalog.is_populated()
+    assert catalog.get_drink("11000")["strDrink"] == "Screwdriver"
@@ -1,10 +1,12 @@
 import pytest
+from app import cocktails
+from app.drink import Drink
 from app.cocktails import (
     fetch_drinks_by_alcohol, fetch_drink_details,
-    drink_matches_mixers, parse_volume_to_ounces,
+    drink_matches_mixers, get_mixer_match_score, MixerMatcher, parse_volume_to_ounces,
     recommend_cocktails,
-    standardize_ingredients_to_cup,
-    generate_unique_color
+    standardize_ingredients_to_cup, compute_cup_proportions,
+    generate_unique_color, assign_ingredient_colors, palette_index, INGREDIENT_PALETTE
 )
 from web_app.routes.home_routes import format_measurement
 
@@ -47,6 +49,36 @@ def test_recommend_cocktails():
         assert "name" in recs[0]
         assert "ingredients" in recs[0]
 
+def test_recommend_cocktails_fetches_each_drink_once(monkeypatch):
+    drinks = {
+        "vodka": [{"idDrink": "1"}, {"idDrink": "2"}, {"idDrink": "3"}],
+        "rum": [{"idDrink": "2"}, {"idDrink": "4"}],
+    }
+    details = {
+        "1": {"strDrink": "Zombie Punch", "strIngredient1": "Vodka", "strIngredient2": "Cola"},
+        "2": {"strDrink": "Cuba Libre", "strIngredient1": "Rum", "strIngredient2": "Cola", "strIngredient3": "Lime"},
+        "3": {"strDrink": "Vodka Tonic", "strIngredient1": "Vodka", "strIngredient2": "Tonic Water"},
+        "4": {"strDrink": "Anejo Highball", "strIngredient1": "Rum", "strIngredient2": "Lime", "strIngredient3": "Cola"},
+    }
+    fetched = []
+    def fake_fetch_drink(drink_id):
+        fetched.append(drink_id)
+        return Drink.from_api(details[drink_id])
+    monkeypatch.setattr(cocktails, "fetch_drinks_by_alcohol", lambda alc: drinks[alc])
+    monkeypatch.setattr(cocktails, "fetch_drink", fake_fetch_drink)
+
+    recs = recommend_cocktails({"alcohol_types": ["vodka", "rum"], "mixers": ["cola", "lime"]})
+    # Each candidate is loaded once, for scoring; the returned details reuse that load
+    assert sorted(fetched) == ["1", "2", "3", "4"]
+    assert recs[1]["ingredients"] and recs[1]["ingredients"][0].endswith("Rum")
+    assert [r["name"] for r in recs] == ["Anejo Highball", "Cuba Libre", "Zombie Punch"]
+    assert [r["match_score"] for r in recs] == [2, 2, 1]
+
+    # The streaming variant yields the same candidates, then the same final ranking
+    stream = cocktails.RecommendationStream({"alcohol_types": ["vodka", "rum"], "mixers": ["cola", "lime"]}, max_results=2)
+    assert sorted(r["name"] for r in stream) == ["Anejo Highball", "Cuba Libre", "Zombie Punch"]
+    assert stream.final_ids() == ["4", "2"]
+
 
 
 def test_fetch_drinks_by_alcohol():
@@ -59,6 +91,33 @@ def test_fetch_drink_details():
     detail = fetch_drink_details("11000")  # Test with Margarita id
     assert detail is None or isinstance(detail, dict)
 
+def test_drink_parses_api_record_once():
+    detail = {
+        "idDrink": "11000",
+        "strDrink": "Mojito",
+        "strInstructions": " Muddle mint leaves with sugar and lime juice. ",
+        "strIngredient1": "Light rum ",
+        "strMeasure1": "2-3 oz ",
+        "strIngredient2": "Mint",
+        "strMeasure2": None,
+        "strIngredient3": "",
+    }
+    drink = Drink.from_api(detail)
+    assert drink.pairs == (("Light rum", "2-3 oz"), ("Mint", ""))
+    assert drink.ingredient_keys == ("light rum", "mint")
+    assert drink.ingredient_lines == ["2-3 oz Light rum", " Mint"]
+    assert drink.instructions == "Muddle mint leaves with sugar and lime juice."
+    assert Drink.from_api(drink.to_dict()).pairs == drink.pairs
+
+def test_shared_cache_round_trips_drinks(tmp_path):
+    from app.cache import SharedTTLCache
+    cache = SharedTTLCache("upstream", path=str(tmp_path / "cache.db"), encode=cocktails.encode_cached_value, decode=cocktails.decode_cached_value)
+    cache.set(("lookup.php", "11000"), Drink("11000", "Mojito", pairs=[("Light rum", "2 oz")]), ttl=100)
+    cache.set(("list.php",), ["Light rum"], ttl=100)
+    drink = cache.get(("lookup.php", "11000"))
+    assert isinstance(drink, Drink) and drink.pairs == (("Light rum", "2 oz"),)
+    assert cache.get(("list.php",)) == ["Light rum"]
+
 def test_standardize_ingredients_to_cup():
     detail = {
         "strIngredient1": "Vodka",
@@ -74,6 +133,26 @@ def test_standardize_ingredients_to_cup():
     total_vol = sum(vol for _, vol, _ in standardized)
     assert abs(total_vol - 16.0) < 0.1  # Should be approximately 16 oz
 
+def test_standardize_ingredients_scales_cached_proportions():
+    detail = {
+        "strDrink": "Screwdriver",
+        "strInstructions": "Fill a highball glass with ice.",
+        "strIngredient1": "Vodka",
+        "strMeasure1": "2 oz",
+        "strIngredient2": "Orange Juice",
+        "strMeasure2": "6 oz",
+        "strIngredient3": "Ice",
+    }
+    compute_cup_proportions.cache_clear()
+    for size in (12.0, 16.0, 64.0):
+        standardized = standardize_ingredients_to_cup(detail, cup_size_oz=size)
+        volumes = {ing: vol for ing, vol, _ in standardized}
+        # "Fill ... with ice" takes 3/4 of the cup, the rest keeps the 1:3 ratio
+        assert abs(volumes["Ice"] - 0.75 * size) < 1e-9
+        assert abs(volumes["Orange Juice"] - 3 * volumes["Vodka"]) < 1e-9
+        assert abs(sum(pct for _, _, pct in standardized) - 100.0) < 1e-9
+    assert compute_cup_proportions.cache_info().misses == 1
+
 def test_generate_unique_color():
     # Test that same ingredient gets same color consistently
     vodka_color1 = generate_unique_color("Vodka")
@@ -103,9 +182,60 @@ def test_generate_unique_color():
     ]
     assert color in predefined_colors
 
+def test_ingredient_colors_are_stable_and_distinct():
+    # crc32, not the per-process salted hash(): the same every run
+    assert generate_unique_color("Vodka") == INGREDIENT_PALETTE[palette_index("  vodka ")]
+
+    colors = assign_ingredient_colors(["Vodka", "Ice", "Rum", "Lime Juice", "Vodka"])
+    assert colors["Ice"] == "#87CEEB"
+    assert colors["Vodka"] == generate_unique_color("Vodka")
+    assert len(set(colors.values())) == 4
+
+    # More ingredients than colors still gets a color for each
+    many = [f"Ingredient {i}" for i in range(40)]
+    assert set(assign_ingredient_colors(many)) == set(many)
+
+
+
+
 
+def test_fetch_youtube_tutorial_is_cached_by_name(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_DB_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setenv("YOUTUBE_API_KEY", "test-key")
+    searches = []
+    def fake_request(search_query, api_key):
+        searches.append(search_query)
+        if "Margarita" in search_query:
+            return {"video_id": "abc", "video_title": "Margarita", "search_query": search_query, "api_key_missing": False}
+        return {"video_id": None, "video_title": None, "search_query": search_query, "api_key_missing": False}
+    monkeypatch.setattr(cocktails, "request_youtube_tutorial", fake_request)
 
+    assert cocktails.fetch_youtube_tutorial("Margarita")["video_id"] == "abc"
+    assert cocktails.fetch_youtube_tutorial("  margarita ")["video_id"] == "abc"
+    # "No video" answers are cached too
+    assert cocktails.fetch_youtube_tutorial("Obscure Drink")["video_id"] is None
+    assert cocktails.fetch_youtube_tutorial("Obscure Drink")["video_id"] is None
+    assert len(searches) == 2
 
+def test_fetch_youtube_tutorial_survives_errors(tmp_path, monkeypatch):
+    monkeypatch.setenv("YOUTUBE_API_KEY", "test-key")
+    searches = []
+    def failing_request(search_query, api_key):
+        searches.append(search_query)
+        raise cocktails.UpstreamError("timeout", "YouTube timed out")
+    monkeypatch.setattr(cocktails, "request_youtube_tutorial", failing_request)
+
+    # The cache "directory" is a file, so the cache can't be opened: treated as a miss
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    monkeypatch.setenv("CACHE_DB_PATH", str(blocker / "cache.db"))
+    assert cocktails.fetch_youtube_tutorial("Margarita")["error"] == "timeout"
+
+    # Upstream errors aren't cached
+    monkeypatch.setenv("CACHE_DB_PATH", str(tmp_path / "cache.db"))
+    cocktails.fetch_youtube_tutorial("Margarita")
+    cocktails.fetch_youtube_tutorial("Margarita")
+    assert len(searches) == 3
 
 def test_measurement_formatting():
     """Test the measurement formatting based on context."""
@@ -118,3 +248,34 @@ def test_measurement_formatting():
     assert format_measurement("Sugar", 1.0, "1 tsp", "breakdown") == "1 tsp"  # solid shows original
     assert format_measurement("Vodka", 8.0, "2 oz", "breakdown") == "8.0 oz"  # liquid shows ounces
     assert format_measurement("Orange Juice", 5.333, "4 oz", "breakdown") == "5.3 oz"  # liquid shows ounces
+
+def test_mixer_matcher_keeps_the_original_scores():
+    # Expected scores come from the original per-drink get_mixer_match_score loop
+    drinks = [
+        {"strIngredient1": "Vodka", "strIngredient2": "Orange Juice", "strIngredient3": "Pineapple"},
+        {"strIngredient1": "Light rum", "strIngredient2": "Coca-Cola", "strIngredient3": "Lime"},
+        {"strIngredient1": "Gin", "strIngredient2": "Tonic Water", "strIngredient3": "Sugar Syrup"},
+        {"strIngredient1": "Tequila"},
+    ]
+    mixers = ["coke", "oj", "lime juice", "tonic", "sugar", "cola", "cola"]
+    # "lime juice" shares the word "juice" with orange juice; the repeated "cola" counts once
+    assert MixerMatcher(mixers).score_many(drinks) == [2, 3, 2, 0]
+    assert get_mixer_match_score(drinks[1], mixers) == 3
+    assert MixerMatcher([]).score(drinks[0]) == 0
+
+    cases = [
+        # Aliases, in both directions
+        ({"strIngredient1": "Gin", "strIngredient2": "Coca-Cola"}, ["coke"], 1),
+        ({"strIngredient1": "Gin", "strIngredient2": "Coke"}, ["coca-cola"], 1),
+        ({"strIngredient1": "Vodka", "strIngredient2": "OJ"}, ["orange juice"], 1),
+        ({"strIngredient1": "Rum", "strIngredient2": "Soda Water"}, ["soda"], 1),
+        # Substrings, in both directions
+        ({"strIngredient1": "Gin", "strIngredient2": "Tonic Water"}, ["water"], 1),
+        ({"strIngredient1": "Rum", "strIngredient2": "Lime"}, ["fresh lime juice"], 1),
+        # Word overlap
+        ({"strIngredient1": "Vodka", "strIngredient2": "Cranberry Juice"}, ["grapefruit juice"], 1),
+        ({"strIngredient1": "Vodka", "strIngredient2": "Ginger Ale"}, ["ginger beer", "ale", "milk"], 2),
+        ({"strIngredient1": "Tequila"}, ["coke"], 0),
+    ]
+    for drink, case_mixers, expected in cases:
+        assert MixerMatcher(case_mixers).score(drink) == expected, (drink, case_mixers)
@@ -0,0 +1,7 @@
+import pytest
+
+@pytest.fixture(autouse=True)
+def isolated_rate_limits(tmp_path, monkeypatch):
+    # The module-level API limiters share their budget through a SQLite file:
+    # keep tests from writing to the real data/ratelimit.db
+    monkeypatch.setenv("RATE_LIMIT_DB_PATH", str(tmp_path / "ratelimit.db"))
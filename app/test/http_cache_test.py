@@ -0,0 +1,21 @@
+import gzip
+
+from app import autocomplete
+from web_app import create_app
+
+def test_etag_304_and_gzip(monkeypatch):
+    monkeypatch.setattr(autocomplete, "fetch_ingredient_list", lambda: ["Vodka", "Amaretto", "Lime Juice"])
+    client = create_app().test_client()
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert b"Amaretto" in gzip.decompress(response.data)
+
+    etag = response.headers["ETag"]
+    again = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    plain = client.get("/")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["ETag"] != etag
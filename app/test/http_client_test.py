@@ -0,0 +1,63 @@
+import pytest
+import requests
+from app import http_client
+from app.http_client import get_json, UpstreamError, parse_retry_after, retry_delay
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+class FakeSession:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    def install(*outcomes):
+        session = FakeSession(outcomes)
+        monkeypatch.setattr(http_client, "get_session", lambda: session)
+        return session
+    return install
+
+def test_get_json_retries_429_using_retry_after(fake_session):
+    session = fake_session(FakeResponse(429, headers={"Retry-After": "2"}), FakeResponse(200, {"drinks": []}))
+    sleeps = []
+    assert get_json("https://example.com", sleep=sleeps.append) == {"drinks": []}
+    assert session.calls == 2
+    assert sleeps == [2.0]
+
+def test_get_json_does_not_retry_client_errors(fake_session):
+    session = fake_session(FakeResponse(404))
+    with pytest.raises(UpstreamError) as excinfo:
+        get_json("https://example.com", sleep=lambda s: None)
+    assert excinfo.value.kind == "http_error"
+    assert session.calls == 1
+
+def test_get_json_gives_up_after_retries(fake_session):
+    timeout = requests.exceptions.Timeout("slow")
+    session = fake_session(timeout, timeout, timeout)
+    with pytest.raises(UpstreamError) as excinfo:
+        get_json("https://example.com", retries=2, sleep=lambda s: None)
+    assert excinfo.value.kind == "timeout"
+    assert session.calls == 3
+
+def test_retry_delay_backs_off_with_jitter():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("not a date") is None
+    for attempt in range(4):
+        delay = retry_delay(attempt)
+        base = min(http_client.BACKOFF_MAX, http_client.BACKOFF_BASE * 2 ** attempt)
+        assert base / 2 <= delay <= base
@@ -0,0 +1,40 @@
+from app.measures import parse_volume_to_ounces, parse_measures, parse_normalized_measure
+
+def test_unit_table():
+    assert round(parse_volume_to_ounces("1 tsp"), 3) == 0.167
+    assert parse_volume_to_ounces("2 tbsp") == 1.0
+    assert parse_volume_to_ounces("1 jigger") == 1.5
+    assert parse_volume_to_ounces("2 shots") == 3.0
+    assert parse_volume_to_ounces("1 pint") == 16.0
+    assert parse_volume_to_ounces("1/2 cup") == 4.0
+    assert round(parse_volume_to_ounces("4cl"), 3) == 1.352
+
+def test_ranges_fractions_and_garnishes():
+    assert parse_volume_to_ounces("2-3 oz") == 2.0
+    assert parse_volume_to_ounces("1 1/2 oz") == 1.5
+    # Hyphenated mixed numbers aren't ranges
+    assert parse_volume_to_ounces("1-1/2 oz") == 1.5
+    assert parse_volume_to_ounces("2-1/2 oz") == 2.5
+    assert parse_volume_to_ounces("1 - 1/2 oz") == 1.5
+    assert parse_volume_to_ounces("1 (12 oz) can") == 13.0
+    assert parse_volume_to_ounces("1 slice") == 0.0
+    assert parse_volume_to_ounces("Garnish with 1 lime wedge") == 0.0
+
+def test_comma_decimals():
+    # European recipes write 1.5 cl as "1,5 cl"
+    assert round(parse_volume_to_ounces("1,5 cl"), 3) == 0.507
+    assert round(parse_volume_to_ounces("2,5-3 cl"), 3) == 0.845
+
+def test_ice():
+    assert parse_volume_to_ounces("Fill with ice") == 4.0
+    assert parse_volume_to_ounces("3 cubes") == 4.5
+    assert parse_volume_to_ounces("1 cube") == 4.5
+
+def test_memoized_on_normalized_text():
+    parse_normalized_measure.cache_clear()
+    parse_volume_to_ounces("1 oz")
+    parse_volume_to_ounces("  1   OZ ")
+    assert parse_normalized_measure.cache_info().hits == 1
+
+def test_parse_measures_batch():
+    assert parse_measures(["1 oz", "1 oz", "2 tbsp"]) == {"1 oz": 1.0, "2 tbsp": 1.0}
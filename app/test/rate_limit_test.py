@@ -0,0 +1,54 @@
+from app.rate_limit import SharedTokenBucket, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def test_token_bucket_allows_burst_then_waits():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    # Bucket is empty: the third request has to wait for half a second's worth of refill
+    assert bucket.acquire() == 0.5
+    assert clock.now == 0.5
+
+def test_token_bucket_refills_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=3, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        bucket.acquire()
+    clock.now += 100
+    assert bucket.reserve() == 0
+    assert bucket.tokens == 2
+
+def test_shared_token_bucket_is_one_budget_for_all_workers(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "ratelimit.db")
+    worker_a = SharedTokenBucket("cocktaildb", rate=2, capacity=2, path=path, clock=clock, sleep=clock.sleep)
+    worker_b = SharedTokenBucket("cocktaildb", rate=2, capacity=2, path=path, clock=clock, sleep=clock.sleep)
+    youtube = SharedTokenBucket("youtube", rate=2, capacity=2, path=path, clock=clock, sleep=clock.sleep)
+    assert worker_a.reserve() == 0
+    assert worker_b.reserve() == 0
+    # The bucket is shared: worker_a's next request waits for worker_b's token to refill
+    assert worker_a.reserve() == 0.5
+    # ...but YouTube has its own budget
+    assert youtube.reserve() == 0
+    assert worker_a.stats()["delayed"] == 1
+    assert worker_a.stats()["max_wait"] == 0.5
+
+def test_shared_token_bucket_falls_back_when_the_file_is_unusable(tmp_path):
+    clock = FakeClock()
+    # The "directory" is a file, so the database can't be created
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    bucket = SharedTokenBucket("cocktaildb", rate=2, capacity=2, path=str(blocker / "ratelimit.db"), clock=clock, sleep=clock.sleep)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0.5
@@ -0,0 +1,128 @@
+import threading
+import time
+
+from app import cocktails, recommendations
+from app.cache import SingleFlight
+from app.drink import Drink
+
+def test_preference_key_is_order_and_case_insensitive():
+    a = recommendations.preference_key({"alcohol_types": ["Vodka", "gin"], "mixers": ["lime juice", "Tonic", "tonic"]})
+    b = recommendations.preference_key({"alcohol_types": ["gin", "vodka "], "mixers": ["tonic", "lime juice"]})
+    assert a == b == (("gin", "vodka"), ("lime juice", "tonic"))
+
+def test_identical_searches_are_computed_once(monkeypatch):
+    recommendations.recommendation_cache.clear()
+    calls = []
+    def compute(user_prefs):
+        calls.append(user_prefs)
+        time.sleep(0.05)
+        return [{"id": "11000", "name": "Screwdriver", "thumb": None, "match_score": 1}]
+    monkeypatch.setattr(recommendations, "compute_recommendations", compute)
+
+    results = []
+    prefs = {"alcohol_types": ["vodka"], "mixers": ["orange juice"]}
+    threads = [threading.Thread(target=lambda: results.append(recommendations.get_recommendations(prefs))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 5 and all(r == results[0] for r in results)
+    # Later lookups hit the result cache
+    recommendations.get_recommendations({"alcohol_types": ["VODKA"], "mixers": ["orange juice"]})
+    assert len(calls) == 1
+    recommendations.recommendation_cache.clear()
+
+def test_stream_leader_caches_final_results(monkeypatch):
+    recommendations.recommendation_cache.clear()
+    results = [{"id": "1", "name": "A", "thumb": None, "match_score": 1}]
+    monkeypatch.setattr(cocktails, "iter_recommendations", lambda user_prefs: iter(results))
+    cached, stream = recommendations.stream_recommendations({"alcohol_types": ["rum"], "mixers": []})
+    assert cached is None
+    list(stream)
+    cached, stream = recommendations.stream_recommendations({"alcohol_types": ["rum"], "mixers": []})
+    assert stream is None and cached == results
+    recommendations.recommendation_cache.clear()
+
+def test_unconsumed_stream_releases_waiters_when_closed(monkeypatch):
+    recommendations.recommendation_cache.clear()
+    results = [{"id": "1", "name": "A", "thumb": None, "match_score": 1}]
+    monkeypatch.setattr(recommendations, "compute_recommendations", lambda user_prefs: results)
+    prefs = {"alcohol_types": ["gin"], "mixers": []}
+    cached, stream = recommendations.stream_recommendations(prefs)
+    assert stream is not None
+
+    # The response closed before the template iterated over the stream
+    waiter = []
+    thread = threading.Thread(target=lambda: waiter.append(recommendations.get_recommendations(prefs)))
+    thread.start()
+    time.sleep(0.05)
+    stream.close()
+    thread.join(timeout=2)
+    assert waiter == [results]
+    recommendations.recommendation_cache.clear()
+
+def test_single_flight_waiters_give_up_after_timeout():
+    flights = SingleFlight()
+    future, is_leader = flights.claim("key")
+    assert is_leader
+    # The leader never finishes: the waiter runs the call itself
+    assert flights.do("key", lambda: 42, timeout=0.01) == 42
+    assert flights.timeouts == 1
+
+def test_pages_follow_score_then_name_without_overlap():
+    recs = [{"id": str(i), "name": name, "thumb": None, "match_score": score}
+            for i, (name, score) in enumerate([("Zombie", 2), ("Mojito", 1), ("Cuba Libre", 2), ("Margarita", 1), ("Mojito", 1)])]
+    seen = []
+    page, cursor = recommendations.paginate(recs, page_size=2)
+    while True:
+        seen.extend((r["name"], r["id"]) for r in page)
+        if cursor is None:
+            break
+        page, cursor = recommendations.paginate(recs, cursor, page_size=2)
+    assert seen == [("Cuba Libre", "2"), ("Zombie", "0"), ("Margarita", "3"), ("Mojito", "1"), ("Mojito", "4")]
+    # A cursor that can't be decoded starts over
+    assert recommendations.paginate(recs, "not-a-cursor", page_size=1)[0][0]["name"] == "Cuba Libre"
+
+def test_single_flight_propagates_errors():
+    flights = SingleFlight()
+    def fail():
+        raise ValueError("upstream down")
+    try:
+        flights.do("key", fail)
+    except ValueError:
+        pass
+    assert flights.do("key", lambda: 42) == 42
+
+def test_batch_shares_fetches_across_guests(monkeypatch):
+    recommendations.recommendation_cache.clear()
+    monkeypatch.setattr(recommendations.catalog, "is_populated", lambda: False)
+    filter_calls = []
+    def by_alcohol(alc):
+        filter_calls.append(alc)
+        return {"vodka": [{"idDrink": "1"}, {"idDrink": "2"}], "rum": [{"idDrink": "2"}, {"idDrink": "3"}]}[alc]
+    details = {
+        "1": Drink("1", "Screwdriver", pairs=[("Vodka", ""), ("Orange juice", "")]),
+        "2": Drink("2", "Vodka Rum Cola", pairs=[("Vodka", ""), ("Rum", ""), ("Cola", "")]),
+        "3": Drink("3", "Cuba Libre", pairs=[("Rum", ""), ("Cola", ""), ("Lime", "")]),
+    }
+    fetched = []
+    def fetch_drink(drink_id):
+        fetched.append(drink_id)
+        return details[drink_id]
+    monkeypatch.setattr(cocktails, "fetch_drinks_by_alcohol", by_alcohol)
+    monkeypatch.setattr(cocktails, "fetch_drink", fetch_drink)
+
+    batch = recommendations.recommend_batch([
+        {"alcohol_types": ["vodka"], "mixers": []},
+        {"alcohol_types": ["rum"], "mixers": ["cola"]},
+        {"alcohol_types": ["Vodka", "rum"], "mixers": ["coke"]},
+        {"alcohol_types": ["vodka"], "mixers": []},
+    ])
+    assert sorted(filter_calls) == ["rum", "vodka"]
+    assert sorted(fetched) == ["1", "2", "3"]
+    assert [[r["id"] for r in recs] for recs in batch["results"]] == [["1", "2"], ["3", "2"], ["3", "2"], ["1", "2"]]
+    assert [(d["name"], d["guests"]) for d in batch["most_guests"]] == [
+        ("Vodka Rum Cola", [0, 1, 2, 3]), ("Cuba Libre", [1, 2]), ("Screwdriver", [0, 3]),
+    ]
+    recommendations.recommendation_cache.clear()
@@ -0,0 +1,75 @@
+from app import catalog
+from app import cocktails
+from app import scoring
+from app.scoring import CatalogMatrix
+
+DRINKS = {
+    "1": ("Screwdriver", None, ["vodka", "orange juice"]),
+    "2": ("Cuba Libre", None, ["light rum", "lime", "coca-cola"]),
+    "3": ("Vodka Cola", None, ["vodka", "coca-cola"]),
+    "4": ("Black Russian", None, ["vodka", "coffee liqueur"]),
+    "5": ("Anejo Highball", None, ["anejo rum", "lime", "ginger beer"]),
+}
+
+# Near misses for "what can I make?"
+INVENTORY_DRINKS = {
+    **DRINKS,
+    "6": ("Gin and Tonic", None, ["gin", "tonic water"]),
+    "7": ("Moscow Mule", None, ["vodka", "lime", "ginger beer"]),
+    "8": ("Rum Soda", None, ["light rum", "soda water", "ice"]),
+}
+
+def test_catalog_matrix_filters_and_scores():
+    matrix = CatalogMatrix(DRINKS)
+    rows, scores = matrix.top_k(["vodka"], [], 10)
+    assert [matrix.names[r] for r in rows] == ["Black Russian", "Screwdriver", "Vodka Cola"]
+    assert scores == [0, 0, 0]
+
+    rows, scores = matrix.top_k(["vodka", "light rum"], ["coke", "lime"], 10)
+    assert [matrix.names[r] for r in rows] == ["Cuba Libre", "Vodka Cola"]
+    assert scores == [2, 1]
+
+def test_catalog_matrix_top_k_keeps_ordering():
+    matrix = CatalogMatrix(DRINKS)
+    rows, _ = matrix.top_k(["vodka"], [], 2)
+    assert [matrix.names[r] for r in rows] == ["Black Russian", "Screwdriver"]
+    assert matrix.top_k(["absinthe"], [], 5) == ([], [])
+
+def test_rank_catalog(tmp_path, monkeypatch):
+    monkeypatch.setenv("CATALOG_DB_PATH", str(tmp_path / "catalog.db"))
+    cocktails.catalog_cache.clear()
+    catalog.save_drinks([
+        {"idDrink": "1", "strDrink": "Screwdriver", "strInstructions": "Stir.", "strIngredient1": "Vodka", "strMeasure1": "2 oz", "strIngredient2": "Orange Juice"},
+        {"idDrink": "3", "strDrink": "Vodka Cola", "strIngredient1": "Vodka", "strIngredient2": "Coca-Cola"},
+    ])
+    catalog.set_meta("last_synced_at", "1")
+    recs = scoring.rank_catalog({"alcohol_types": ["vodka"], "mixers": ["orange"]})
+    assert recs == [{"name": "Screwdriver", "id": "1", "thumb": None, "match_score": 1}]
+    assert [r["name"] for r in scoring.rank_catalog({"alcohol_types": ["vodka"], "mixers": []})] == ["Screwdriver", "Vodka Cola"]
+    catalog.close_connections()
+    cocktails.catalog_cache.clear()
+
+def test_find_makeable_drinks(monkeypatch):
+    from app import scoring
+    monkeypatch.setattr(scoring, "get_catalog_matrix", lambda: CatalogMatrix(INVENTORY_DRINKS))
+    results = scoring.find_makeable_drinks(["Vodka", "Coke", "rum", "Lime"], max_missing=1)
+    # "coke" covers coca-cola through the alias table, "rum" covers light/anejo rum
+    assert [d["name"] for d in results["exact"]] == ["Cuba Libre", "Vodka Cola"]
+    assert [(d["name"], d["missing"]) for d in results["missing"]] == [
+        ("Anejo Highball", ["ginger beer"]), ("Black Russian", ["coffee liqueur"]), ("Moscow Mule", ["ginger beer"]),
+        ("Rum Soda", ["soda water"]), ("Screwdriver", ["orange juice"]),
+    ]
+    # Pantry water isn't tonic or soda water, and "beer" isn't ginger beer
+    assert scoring.find_makeable_drinks(["gin"], max_missing=0) == {"exact": [], "missing": []}
+    assert scoring.find_makeable_drinks(["rum"], max_missing=0) == {"exact": [], "missing": []}
+    assert scoring.find_makeable_drinks(["vodka", "beer", "lime"], max_missing=0) == {"exact": [], "missing": []}
+    # Explicit aliases still count: "tonic" covers tonic water
+    assert [d["name"] for d in scoring.find_makeable_drinks(["gin", "tonic"], max_missing=0)["exact"]] == ["Gin and Tonic"]
+
+def test_no_matrix_before_the_first_sync(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.db"
+    monkeypatch.setenv("CATALOG_DB_PATH", str(path))
+    assert scoring.get_catalog_matrix() is None
+    assert scoring.rank_catalog({"alcohol_types": ["vodka"], "mixers": []}) == []
+    # Asking doesn't create an empty catalog file
+    assert not path.exists()
@@ -0,0 +1,28 @@
+from app import catalog
+from app.drink import Drink
+from app.similarity import nearest_neighbours
+
+DRINKS = [
+    Drink("1", "Screwdriver", pairs=[("Vodka", "2 oz"), ("Orange Juice", "6 oz"), ("Ice", "1 cup")]),
+    Drink("2", "Harvey Wallbanger", pairs=[("Vodka", "1 oz"), ("Galliano", "1/2 oz"), ("Orange Juice", "4 oz")]),
+    Drink("3", "Vodka Martini", pairs=[("Vodka", "3 oz"), ("Dry Vermouth", "1/2 oz"), ("Olive", "1")]),
+    Drink("4", "Gin Martini", pairs=[("Gin", "3 oz"), ("Dry Vermouth", "1/2 oz"), ("Olive", "1")]),
+    Drink("5", "Mojito", pairs=[("Light rum", "2 oz"), ("Mint", ""), ("Sugar", "")]),
+]
+
+def test_nearest_neighbours_follow_cup_proportions():
+    neighbours = nearest_neighbours(DRINKS, k=2)
+    assert neighbours["1"][0][0] == "2"  # mostly orange juice, like the Screwdriver
+    assert neighbours["4"][0][0] == "3"
+    assert all(similar_id != "1" for similar_id, _ in neighbours["1"])
+    assert neighbours["5"] == []  # nothing in common
+
+def test_similarity_index_in_catalog(tmp_path, monkeypatch):
+    monkeypatch.setenv("CATALOG_DB_PATH", str(tmp_path / "catalog.db"))
+    from app.similarity import build_similarity_index
+    catalog.save_drinks([drink.to_dict() for drink in DRINKS])
+    assert build_similarity_index() == 5
+    similar = catalog.get_similar_drinks("4", limit=1)
+    assert [(s["id"], s["name"]) for s in similar] == [("3", "Vodka Martini")]
+    assert catalog.get_similar_drinks("5") == []
+    catalog.close_connections()
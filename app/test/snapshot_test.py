@@ -0,0 +1,68 @@
+import gc
+import pytest
+import weakref
+
+from app import catalog
+from app.drink import Drink
+from app.snapshot import CatalogSnapshot, get_snapshot, write_snapshot
+
+DRINKS = [
+    Drink("11000", "Mojito", "Muddle mint.", thumb="https://example.com/mojito.jpg", pairs=[("Light rum", "2 oz"), ("Mint", "")]),
+    Drink("11007", "Margarita", pairs=[("Tequila", "1 1/2 oz"), ("Triple sec", "1/2 oz"), ("Lime juice", "1 oz")]),
+    Drink("178325", "Aperol Spritz", category="Cocktail", pairs=[("Aperol", "2 oz"), ("Mint", "1 sprig")]),
+]
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "catalog.snapshot")
+    write_snapshot(DRINKS, "42", path)
+    snapshot = CatalogSnapshot(path)
+    assert snapshot.buffer is None  # nothing is read until it's used
+    assert snapshot.version == "42"
+    assert len(snapshot) == 3
+
+    mojito = snapshot.get_drink("11000")
+    assert (mojito.name, mojito.instructions, mojito.thumb, mojito.category) == ("Mojito", "Muddle mint.", "https://example.com/mojito.jpg", None)
+    assert mojito.pairs == DRINKS[0].pairs
+    assert snapshot.get_drink("178325").category == "Cocktail"
+    assert snapshot.get_drink("99999") is None
+    assert snapshot.get_drink("11007").ounces == (1.5, 0.5, 1.0)
+    assert snapshot.drink_ingredient_keys()["11000"] == ("Mojito", "https://example.com/mojito.jpg", ["light rum", "mint"])
+
+def test_catalog_snapshot_follows_sync_version(tmp_path, monkeypatch):
+    monkeypatch.setenv("CATALOG_DB_PATH", str(tmp_path / "catalog.db"))
+    monkeypatch.setenv("CATALOG_SNAPSHOT_PATH", str(tmp_path / "catalog.snapshot"))
+    catalog.save_drinks([DRINKS[0].to_dict()])
+    catalog.set_meta("last_synced_at", "1")
+    assert catalog.get_snapshot() is None
+    catalog.write_catalog_snapshot()
+    assert catalog.get_snapshot().get_drink("11000").name == "Mojito"
+    # A newer sync without a new snapshot: the old one isn't used
+    catalog.set_meta("last_synced_at", "2")
+    assert catalog.get_snapshot() is None
+    catalog.close_connections()
+
+def test_replaced_snapshot_is_unmapped(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.snapshot")
+    monkeypatch.setenv("CATALOG_SNAPSHOT_PATH", path)
+    write_snapshot(DRINKS, "1", path)
+    old = get_snapshot()
+    assert old.get_drink("11000").name == "Mojito"
+    old_ref = weakref.ref(old)
+    del old
+
+    write_snapshot(DRINKS[:1], "2", path)
+    assert get_snapshot().version == "2"
+    gc.collect()
+    assert old_ref() is None
+
+def test_cup_proportions_use_the_snapshot_ounces(tmp_path, monkeypatch):
+    from app import cocktails
+    path = str(tmp_path / "catalog.snapshot")
+    write_snapshot(DRINKS, "1", path)
+    margarita = CatalogSnapshot(path).get_drink("11007")
+    expected = cocktails.standardize_ingredients_to_cup(DRINKS[1])
+
+    cocktails.compute_cup_proportions.cache_clear()
+    monkeypatch.setattr(cocktails, "parse_volume_to_ounces", lambda measure: pytest.fail("re-parsed " + measure))
+    assert cocktails.standardize_ingredients_to_cup(margarita) == expected
+    cocktails.compute_cup_proportions.cache_clear()
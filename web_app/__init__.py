@@ -14,4 +14,11 @@ def create_app():
     from .routes.home_routes import home_routes
     app.register_blueprint(home_routes)
 
+    from .routes.async_routes import async_routes
+    app.register_blueprint(async_routes)
+
+    # ETags / 304s, compression and the rendered fragment cache
+    from .http_cache import init_http_cache
+    init_http_cache(app)
+
     return app
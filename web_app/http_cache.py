@@ -0,0 +1,81 @@
+import gzip
+import hashlib
+
+from flask import render_template, request
+from markupsafe import Markup
+
+from app.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Response-level caching for the web app:
+#  - strong ETags on every complete GET response, answered with 304 Not Modified
+#    when the browser already has that version
+#  - gzip (or brotli, if installed) compression for text responses
+#  - a cache of rendered template fragments that are identical for every visitor
+# Streamed responses (the progressive recommendations page) are left alone.
+
+MIN_COMPRESS_SIZE = 500
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+FRAGMENT_CACHE_TTL = 3600
+fragment_cache = TTLCache(maxsize=2048)
+
+
+def render_fragment(key, template_name, context_fn):
+    # Rendered HTML for `key`, rendering template_name with context_fn() on a miss
+    html = fragment_cache.get(key)
+    if html is None:
+        html = Markup(render_template(template_name, **context_fn()))
+        fragment_cache.set(key, html, FRAGMENT_CACHE_TTL)
+    return html
+
+
+def choose_encoding(accept_encoding):
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body)
+    # mtime=0 keeps the output (and so the ETag) the same for the same body
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def cache_response(response):
+    if request.method not in ("GET", "HEAD") or response.status_code != 200:
+        return response
+    if response.is_streamed or response.direct_passthrough:
+        return response
+
+    body = response.get_data()
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    if (
+        encoding
+        and len(body) >= MIN_COMPRESS_SIZE
+        and "Content-Encoding" not in response.headers
+        and (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)
+    ):
+        body = compress(body, encoding)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+
+    if not response.headers.get("ETag"):
+        response.set_etag(hashlib.sha1(body).hexdigest())
+    if "Cache-Control" not in response.headers:
+        # Pages depend on the session (flash messages, last search): always revalidate
+        response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+def init_http_cache(app):
+    app.after_request(cache_response)
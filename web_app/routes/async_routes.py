@@ -0,0 +1,94 @@
+# this is the "web_app/routes/async_routes.py" file...
+
+# Async variants of the recommendation, detail and compatible-mixer pages.
+# They use the httpx-based client in app/async_client.py, so a worker waiting on
+# TheCocktailDB or YouTube isn't blocked in a thread per upstream request.
+
+import asyncio
+
+from flask import Blueprint, request, render_template, redirect, url_for, flash, session, jsonify
+
+from app import catalog
+from app.async_client import (
+    create_client, fetch_drink_async, fetch_drinks_by_alcohol_async, fetch_drinks_many_async,
+    recommend_cocktails_async, fetch_youtube_tutorial_async,
+)
+from app.cocktails import find_compatible_mixers
+from app.recommendations import (
+    cache_recommendations, compute_recommendations, get_cached_recommendations, normalize_prefs, paginate, preference_key,
+)
+from web_app.routes.home_routes import (
+    cocktail_detail_context, mixers_from_drinks, parse_alcohols_param, parse_cup_size, parse_user_prefs, ranked_mixers_response,
+)
+
+async_routes = Blueprint("async_routes", __name__, url_prefix="/async")
+
+@async_routes.route("/recommendations", methods=["POST"])
+async def recommendations():
+    alcohols = request.form.get("alcohols", "").strip()
+    mixers = request.form.get("mixers", "").strip()
+
+    if not alcohols:
+        flash("Please enter at least one alcohol type.", "danger")
+        return redirect(url_for("home_routes.index"))
+
+    user_prefs = parse_user_prefs(alcohols, mixers)
+
+    key = preference_key(user_prefs)
+    recs = get_cached_recommendations(key)
+    if recs is None:
+        if catalog.is_populated():
+            recs = compute_recommendations(user_prefs)
+        else:
+            async with create_client() as client:
+                recs = await recommend_cocktails_async(client, normalize_prefs(user_prefs), max_results=None)
+        cache_recommendations(key, recs)
+
+    if not recs:
+        flash("No cocktails found for those ingredients. Try different combinations.", "warning")
+        return redirect(url_for("home_routes.index"))
+
+    session['last_search_alcohols'] = user_prefs["alcohol_types"]
+    session['last_search_mixers'] = user_prefs["mixers"]
+
+    page, next_cursor = paginate(recs)
+    return render_template("recommendations.html", cocktails=page, next_cursor=next_cursor)
+
+@async_routes.route("/cocktail/<drink_id>")
+async def cocktail_detail(drink_id):
+    async with create_client() as client:
+        drink = await fetch_drink_async(client, drink_id)
+        if not drink:
+            flash(f"Sorry, we couldn't load the details for this cocktail (ID: {drink_id}). It may have been removed or there might be a temporary API issue. Please try another cocktail.", "warning")
+            return redirect(url_for("home_routes.recommendations"))
+        youtube_video = await fetch_youtube_tutorial_async(client, drink.name)
+
+    return render_template("cocktail_detail.html", **cocktail_detail_context(drink, youtube_video, parse_cup_size(request.args.get("cup"))))
+
+@async_routes.route("/compatible_mixers")
+async def compatible_mixers():
+    alcohols = parse_alcohols_param(request.args.get('alcohols', '').strip())
+    if not alcohols:
+        return {'mixers': []}
+
+    ranked = find_compatible_mixers(alcohols)
+    if ranked is not None:
+        return jsonify(ranked_mixers_response(ranked))
+
+    # Sample up to 25 recipes from the API, all at once instead of one by one
+    max_calls_per_alcohol = max(1, 20 // len(alcohols))
+    async with create_client() as client:
+        drink_lists = await asyncio.gather(*(fetch_drinks_by_alcohol_async(client, alc) for alc in alcohols))
+        drink_ids = []
+        for drinks in drink_lists:
+            for d in drinks[:max_calls_per_alcohol]:
+                if isinstance(d, dict) and 'idDrink' in d and d['idDrink'] not in drink_ids:
+                    drink_ids.append(d['idDrink'])
+        drink_ids = drink_ids[:25]
+        drinks = await fetch_drinks_many_async(client, drink_ids)
+
+    fetched = [drink for drink in drinks if drink]
+    response = {'mixers': sorted(mixers_from_drinks(fetched, alcohols))}
+    if len(fetched) < len(drink_ids) or len(drink_ids) >= 25:
+        response['warning'] = 'Results limited due to API constraints. More alcohols = more potential mixers!'
+    return jsonify(response)
@@ -1,15 +1,22 @@
 # this is the "web_app/routes/home_routes.py" file...
 
-from flask import Blueprint, request, render_template, redirect, url_for, flash
+from flask import Blueprint, Response, request, render_template, stream_template, redirect, url_for, flash
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the parent directory to the Python path so we can import app modules
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from app.cocktails import recommend_cocktails, fetch_drink_details, fetch_ingredient_list, fetch_drinks_by_alcohol, search_youtube_tutorial, standardize_ingredients_to_cup, generate_unique_color, parse_volume_to_ounces, is_solid_ingredient
+from app import catalog
+from app import recommendations as recommendation_results
+from app.autocomplete import get_ingredient_index
+from app.scoring import find_makeable_drinks
+from web_app.http_cache import render_fragment
+from app.recommendations import get_recommendations, paginate, recommend_batch, stream_recommendations
+from app.cocktails import COMMON_ALCOHOLS, cache_stats, find_compatible_mixers, fetch_drink, fetch_drinks_by_alcohol, fetch_youtube_tutorial, get_cached_youtube_tutorial, CUP_SIZES, assign_ingredient_colors, standardize_ingredients_to_cup, is_solid_ingredient
 
-def format_measurement(ingredient_name, vol_oz, original_measure=None, context="visualization"):
+def format_measurement(ingredient_name, vol_oz, original_measure=None, context="visualization", cup_size_oz=16.0):
     """Format measurements based on context.
 
     Args:
@@ -36,7 +43,7 @@ def format_measurement(ingredient_name, vol_oz, original_measure=None, context="
                 return f"{vol_oz:.1f} oz"
         else:
             # For liquid ingredients, convert to cup fraction format
-            fraction = vol_oz / 16.0
+            fraction = vol_oz / cup_size_oz
             if abs(fraction - 1/2) < 0.01:
                 return "1/2 of a cup"
             elif abs(fraction - 1/3) < 0.01:
@@ -66,38 +73,59 @@ def get_percentage_display(ingredient_name, pct):
 
 home_routes = Blueprint("home_routes", __name__)
 
+# Runs YouTube lookups next to the recipe work on the detail page
+youtube_executor = ThreadPoolExecutor(max_workers=4)
+
+# Common alcohols and mixers, listed first on the home page
+COMMON_ALCOHOL_OPTIONS = ['Vodka', 'Gin', 'Rum', 'Whiskey', 'Tequila', 'Bourbon', 'Scotch', 'Wine', 'Beer', 'Champagne', 'Cognac', 'Brandy', 'Vermouth']
+COMMON_MIXER_OPTIONS = ['Orange Juice', 'Lemon Juice', 'Lime Juice', 'Cola', 'Soda Water', 'Tonic Water', 'Sugar', 'Salt', 'Mint', 'Ice', 'Coca-Cola', 'Sprite', 'Cranberry Juice', 'Pineapple Juice']
+
+# How many other popular ingredients the home page starts with; the rest are
+# found through /ingredients/autocomplete as the user types
+INITIAL_SUGGESTIONS = 20
+MAX_AUTOCOMPLETE_RESULTS = 50
+
 @home_routes.route("/")
 @home_routes.route("/home")
 def index():
-    ingredients = fetch_ingredient_list()
-    # Separate common alcohols and mixers for prioritized display
-    common_alcohols = ['Vodka', 'Gin', 'Rum', 'Whiskey', 'Tequila', 'Bourbon', 'Scotch', 'Wine', 'Beer', 'Champagne', 'Cognac', 'Brandy', 'Vermouth']
-    common_mixers = ['Orange Juice', 'Lemon Juice', 'Lime Juice', 'Cola', 'Soda Water', 'Tonic Water', 'Sugar', 'Salt', 'Mint', 'Ice', 'Coca-Cola', 'Sprite', 'Cranberry Juice', 'Pineapple Juice']
-    return render_template("home.html", ingredients=ingredients, common_alcohols=common_alcohols, common_mixers=common_mixers)
+    popular = [name for name, _ in get_ingredient_index().search("", limit=INITIAL_SUGGESTIONS + len(COMMON_MIXER_OPTIONS))]
+    alcohol_suggestions = [name for name in popular if name not in COMMON_ALCOHOL_OPTIONS][:INITIAL_SUGGESTIONS]
+    mixer_suggestions = [name for name in popular if name not in COMMON_MIXER_OPTIONS][:INITIAL_SUGGESTIONS]
+    alcohol_select = render_fragment(("select", "alcoholSelect", tuple(alcohol_suggestions)), "_ingredient_select.html",
+                                     lambda: dict(select_id="alcoholSelect", label="alcohols", common=COMMON_ALCOHOL_OPTIONS, suggestions=alcohol_suggestions))
+    mixer_select = render_fragment(("select", "mixerSelect", tuple(mixer_suggestions)), "_ingredient_select.html",
+                                   lambda: dict(select_id="mixerSelect", label="mixers", common=COMMON_MIXER_OPTIONS, suggestions=mixer_suggestions))
+    return render_template("home.html", alcohol_select=alcohol_select, mixer_select=mixer_select)
+
+@home_routes.route("/ingredients/autocomplete")
+def ingredient_autocomplete():
+    from flask import jsonify
+    query = request.args.get("q", "")
+    limit = min(request.args.get("limit", 10, type=int), MAX_AUTOCOMPLETE_RESULTS)
+    results = get_ingredient_index().search(query, limit=limit)
+    return jsonify({"query": query, "results": [{"name": name, "popularity": popularity} for name, popularity in results]})
+
+def parse_user_prefs(alcohols, mixers):
+    return {
+        "alcohol_types": [x.strip().lower() for x in alcohols.split(",") if x.strip()],
+        "mixers": [x.strip().lower() for x in mixers.split(",") if x.strip()]
+    }
 
 @home_routes.route("/recommendations", methods=["GET", "POST"])
 def recommendations():
     from flask import session
 
     if request.method == "GET":
-        # Check if we have stored cocktail IDs to show the exact same results
-        if 'last_cocktail_ids' in session:
-            cocktail_ids = session['last_cocktail_ids']
-            recs = []
-
-            # Reconstruct the cocktail list from stored IDs
-            for cocktail_id in cocktail_ids:
-                detail = fetch_drink_details(cocktail_id)
-                if detail:
-                    cocktail = {
-                        "id": cocktail_id,
-                        "name": detail["strDrink"],
-                        "thumb": detail.get("strDrinkThumb")
-                    }
-                    recs.append(cocktail)
-
+        # Back navigation and ?cursor= pages: re-run the last search, which is
+        # served from the server-side result cache while it's warm
+        if 'last_search_alcohols' in session:
+            recs = get_recommendations({
+                "alcohol_types": session['last_search_alcohols'],
+                "mixers": session.get('last_search_mixers', [])
+            })
             if recs:
-                return render_template("recommendations.html", cocktails=recs)
+                page, next_cursor = paginate(recs, request.args.get("cursor"))
+                return render_template("recommendations.html", cocktails=page, next_cursor=next_cursor)
 
         return redirect(url_for("home_routes.index"))
 
@@ -108,69 +136,118 @@ def recommendations():
         flash("Please enter at least one alcohol type.", "danger")
         return redirect(url_for("home_routes.index"))
 
-    alcohol_types = [x.strip().lower() for x in alcohols.split(",") if x.strip()]
-    mixers_list = [x.strip().lower() for x in mixers.split(",") if x.strip()]
-
-    user_prefs = {
-        "alcohol_types": alcohol_types,
-        "mixers": mixers_list
-    }
+    user_prefs = parse_user_prefs(alcohols, mixers)
+    session['last_search_alcohols'] = user_prefs["alcohol_types"]
+    session['last_search_mixers'] = user_prefs["mixers"]
 
-    recs = recommend_cocktails(user_prefs)
+    if catalog.is_populated():
+        recs = get_recommendations(user_prefs)
+    else:
+        # Details come from the API: unless the same search is cached or already
+        # running, stream the page so cards show up as their details arrive and
+        # are reordered into the first page at the end.
+        recs, stream = stream_recommendations(user_prefs)
+        if stream is not None:
+            next_page = lambda: paginate(stream.results)[1]
+            response = Response(stream_template("recommendations.html", cocktails=stream, streaming=True, next_page=next_page))
+            # Releases identical searches waiting on this one even if the page never reached the cards
+            response.call_on_close(stream.close)
+            return response
 
     if not recs:
         flash("No cocktails found for those ingredients. Try different combinations.", "warning")
         return redirect(url_for("home_routes.index"))
 
-    # Store only the cocktail IDs in session for reliable back navigation
-    cocktail_ids = [cocktail['id'] for cocktail in recs]
-    session['last_cocktail_ids'] = cocktail_ids
-    session['last_search_alcohols'] = alcohol_types
-    session['last_search_mixers'] = mixers_list
-
-    return render_template("recommendations.html", cocktails=recs)
+    page, next_cursor = paginate(recs)
+    return render_template("recommendations.html", cocktails=page, next_cursor=next_cursor)
+
+@home_routes.route("/inventory")
+def inventory():
+    # "What can I make?": every catalog drink that the listed ingredients cover
+    items = request.args.get("items", "").strip()
+    max_missing = min(max(request.args.get("max_missing", 1, type=int), 0), 3)
+    results = None
+    if items:
+        if catalog.is_populated():
+            results = find_makeable_drinks([x for x in items.split(",") if x.strip()], max_missing=max_missing)
+        else:
+            flash("The local catalog hasn't been synced yet, so there's nothing to search. Run `python -m app.catalog` first.", "warning")
+    return render_template("inventory.html", items=items, max_missing=max_missing, results=results)
 
 @home_routes.route("/cocktail/<drink_id>")
 def cocktail_detail(drink_id):
-    detail = fetch_drink_details(drink_id)
-    if not detail:
+    drink = fetch_drink(drink_id)
+    if not drink:
         flash(f"Sorry, we couldn't load the details for this cocktail (ID: {drink_id}). It may have been removed or there might be a temporary API issue. Please try another cocktail.", "warning")
         return redirect(url_for("home_routes.recommendations"))
 
-    ingredients = []
-    for n in range(1, 16):
-        ing = detail.get(f"strIngredient{n}")
-        measure = detail.get(f"strMeasure{n}")
-        if ing and ing.strip():
-            ingredients.append((measure or "").strip() + " " + ing.strip())
-
+    # The YouTube lookup can be left to the browser (?video=deferred or
+    # YOUTUBE_LOOKUP=deferred) unless it's already cached
+    youtube_video = get_cached_youtube_tutorial(drink.name)
+    cup_size = parse_cup_size(request.args.get("cup"))
+    video_mode = request.args.get("video") or os.environ.get("YOUTUBE_LOOKUP", "inline")
+    if youtube_video is None and video_mode == "deferred":
+        context = cocktail_detail_context(drink, None, cup_size)
+        return render_template("cocktail_detail.html", youtube_deferred=True, drink_id=drink_id, **context)
+
+    # Otherwise look the video up while the recipe is being prepared
+    video_future = None
+    if youtube_video is None:
+        video_future = youtube_executor.submit(fetch_youtube_tutorial, drink.name)
+    context = cocktail_detail_context(drink, youtube_video, cup_size)
+    if video_future is not None:
+        context["youtube_video"] = video_future.result()
+
+    return render_template("cocktail_detail.html", **context)
+
+@home_routes.route("/cocktail/<drink_id>/video")
+def cocktail_video(drink_id):
+    # Video tutorial section for a deferred cocktail_detail page
+    drink = fetch_drink(drink_id)
+    if not drink:
+        return "", 404
+    return render_template("_youtube_video.html", youtube_video=fetch_youtube_tutorial(drink.name))
+
+# How many related drinks the detail page shows
+SIMILAR_DRINKS = 6
+
+def parse_cup_size(value):
+    # ?cup= on the detail page: one of CUP_SIZES, 16 oz otherwise
+    try:
+        cup_size = float(value)
+    except (TypeError, ValueError):
+        return 16.0
+    return cup_size if cup_size in CUP_SIZES else 16.0
+
+def cocktail_detail_context(drink, youtube_video, cup_size_oz=16.0):
+    # Template variables for cocktail_detail.html (shared with the async route)
     cocktail = {
-        "name": detail["strDrink"],
-        "ingredients": ingredients,
-        "instructions": detail.get("strInstructions", "").strip(),
-        "thumb": detail.get("strDrinkThumb"),
-        "detail": detail
+        "name": drink.name,
+        "ingredients": drink.ingredient_lines,
+        "instructions": drink.instructions,
+        "thumb": drink.thumb
     }
-
-    # Fetch YouTube tutorial video
-    youtube_video = search_youtube_tutorial(detail["strDrink"])
-
-    # Collect all ingredients with their measures first
-    all_ingredients = []
-    for n in range(1, 16):
-        ing = detail.get(f"strIngredient{n}")
-        measure = detail.get(f"strMeasure{n}")
-        if ing and ing.strip():
-            all_ingredients.append((ing.strip(), measure or ""))
+    # The cup graphic only depends on the recipe and the cup, so it's rendered once
+    # per (drink id, cup size); the recipe is part of the key so a re-synced drink gets a new one
+    key = ("cup_guide", drink.id, cup_size_oz, drink.name, drink.instructions, drink.pairs)
+    cup_guide = render_fragment(key, "_cup_guide.html", lambda: cup_guide_context(drink, cup_size_oz))
+    # Precomputed at sync time (app/similarity.py): no upstream calls
+    similar_drinks = catalog.get_similar_drinks(drink.id, limit=SIMILAR_DRINKS)
+    return dict(cocktail=cocktail, youtube_video=youtube_video, cup_guide=cup_guide, similar_drinks=similar_drinks, cup_size=cup_size_oz, cup_sizes=CUP_SIZES)
+
+def cup_guide_context(drink, cup_size_oz=16.0):
+    # Template variables for _cup_guide.html
+    # All ingredients with their measures
+    all_ingredients = drink.pairs
 
     # Track which ingredients had original measures vs inferred
     original_measurable = set()
-    for ing, measure in all_ingredients:
-        if parse_volume_to_ounces(measure or "") > 0:
+    for (ing, measure), oz in zip(all_ingredients, drink.measure_ounces()):
+        if oz > 0:
             original_measurable.add(ing)
 
-    # Standardize ingredients for 16 oz red solo cup (this may infer missing amounts)
-    standardized_ingredients = standardize_ingredients_to_cup(detail, cup_size_oz=16.0)
+    # Standardize ingredients for the cup (this may infer missing amounts)
+    standardized_ingredients = standardize_ingredients_to_cup(drink, cup_size_oz=cup_size_oz)
 
     # Sort by percentage descending (largest at bottom)
     standardized_ingredients = sorted(standardized_ingredients, key=lambda x: x[2], reverse=True)
@@ -183,38 +260,67 @@ def cocktail_detail(drink_id):
         if ing not in all_measurable_names or is_solid_ingredient(ing):
             non_measurable_ingredients.append((ing, measure))
 
-    # Generate unique colors for all ingredients (both measurable and non-measurable)
-    # Ensure no color duplicates within each cocktail
-    ingredient_colors = {}
-
-    # Special color for ice
-    ice_color = "#87CEEB"  # Light blue for ice
-
-    # Available colors (excluding ice color)
-    available_colors = [
-        "#DC143C", "#FF4500", "#32CD32", "#00CED1", "#1E90FF",
-        "#9370DB", "#FF69B4", "#8B4513", "#20B2AA", "#FF6347",
-        "#4682B4", "#CD5C5C", "#40E0D0", "#800080", "#008000",
-        "#FFA500", "#FF0000", "#0000FF", "#FFD700", "#228B22",
-        "#FF00FF", "#00FFFF", "#800000", "#808000", "#008080",
-        "#000080", "#696969", "#8B0000", "#8A2BE2", "#FF1493"
-    ]
-
-    color_index = 0
-    for ing, _ in all_ingredients:
-        if ing.lower() == "ice":
-            ingredient_colors[ing] = ice_color
-        else:
-            # Assign next available color
-            ingredient_colors[ing] = available_colors[color_index % len(available_colors)]
-            color_index += 1
+    # Colors for all ingredients (both measurable and non-measurable), the same in every worker
+    ingredient_colors = assign_ingredient_colors([ing for ing, _ in all_ingredients])
 
     # Create ingredient_measures mapping for all ingredients
     ingredient_measures = {}
     for ing, measure in all_ingredients:
         ingredient_measures[ing] = measure
 
-    return render_template("cocktail_detail.html", cocktail=cocktail, youtube_video=youtube_video, standardized_ingredients=standardized_ingredients, ingredient_colors=ingredient_colors, ingredient_measures=ingredient_measures, non_measurable_ingredients=non_measurable_ingredients, format_measurement=format_measurement, get_percentage_display=get_percentage_display)
+    # Ingredient breakdown rows, top of the cup first: (ingredient, color, amount, percentage)
+    breakdown = [
+        (ing, ingredient_colors[ing], format_measurement(ing, vol_oz, ingredient_measures.get(ing, ""), "breakdown"), get_percentage_display(ing, pct))
+        for ing, vol_oz, pct in reversed(standardized_ingredients)
+    ]
+
+    return dict(cup_size=cup_size_oz, standardized_ingredients=standardized_ingredients, ingredient_colors=ingredient_colors, ingredient_measures=ingredient_measures, non_measurable_ingredients=non_measurable_ingredients, breakdown=breakdown)
+
+def parse_alcohols_param(alcohols_param):
+    return [a.strip().lower() for a in alcohols_param.split(',') if a.strip()]
+
+def ranked_mixers_response(ranked):
+    return {
+        'mixers': sorted(mixer for mixer, _ in ranked),
+        'ranked': [{'name': mixer, 'count': count} for mixer, count in ranked],
+    }
+
+def mixers_from_drinks(drinks, alcohols):
+    # Ingredients of the sampled drinks that aren't one of the alcohols
+    compatible_mixers = set()
+    for drink in drinks:
+        for ing_lower in drink.ingredient_keys:
+            # Add as mixer if not in alcohols list and not another alcohol
+            if ing_lower not in alcohols and ing_lower not in COMMON_ALCOHOLS:
+                compatible_mixers.add(ing_lower)
+    return compatible_mixers
+
+MAX_BATCH_SIZE = 100
+
+@home_routes.route("/api/recommendations/batch", methods=["POST"])
+def batch_recommendations():
+    # JSON body: {"preferences": [{"alcohol_types": [...], "mixers": [...]}, ...], "max_results": 10}
+    from flask import jsonify
+    body = request.get_json(silent=True)
+    if isinstance(body, list):
+        body = {"preferences": body}
+    if not isinstance(body, dict) or not isinstance(body.get("preferences"), list):
+        return jsonify({"error": "Expected a JSON object with a \"preferences\" list"}), 400
+
+    prefs_list = []
+    for prefs in body["preferences"]:
+        alcohols = prefs.get("alcohol_types") if isinstance(prefs, dict) else None
+        mixers = prefs.get("mixers", []) if isinstance(prefs, dict) else None
+        if not isinstance(alcohols, list) or not isinstance(mixers, list) or not all(isinstance(x, str) for x in alcohols + mixers):
+            return jsonify({"error": "Each preference set needs an \"alcohol_types\" list (and optionally \"mixers\") of strings"}), 400
+        prefs_list.append({"alcohol_types": alcohols, "mixers": mixers})
+    if len(prefs_list) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} preference sets per request"}), 400
+
+    max_results = body.get("max_results", 10)
+    if not isinstance(max_results, int) or max_results < 1:
+        return jsonify({"error": "\"max_results\" must be a positive integer"}), 400
+    return jsonify(recommend_batch(prefs_list, max_results=min(max_results, 50)))
 
 @home_routes.route("/compatible_mixers")
 def compatible_mixers():
@@ -223,10 +329,14 @@ def compatible_mixers():
         return {'mixers': []}
 
     from flask import jsonify
-    import time
-    alcohols = [a.strip().lower() for a in alcohols_param.split(',') if a.strip()]
+    alcohols = parse_alcohols_param(alcohols_param)
+
+    # Answer from the precomputed co-occurrence index when the catalog has been synced
+    ranked = find_compatible_mixers(alcohols)
+    if ranked is not None:
+        return jsonify(ranked_mixers_response(ranked))
 
-    # Find all mixers that appear in recipes with these alcohols
+    # Otherwise sample recipes from the API
     compatible_mixers = set()
     seen_cocktails = set()
     rate_limited_count = 0
@@ -249,23 +359,14 @@ def compatible_mixers():
                     if total_api_calls > 25:
                         break
 
-                    detail = fetch_drink_details(drink_id)
-                    if detail:
-                        for i in range(1, 16):
-                            ing = detail.get(f'strIngredient{i}')
-                            if ing and ing.strip():
-                                ing_lower = ing.lower().strip()
-                                # Add as mixer if not in alcohols list and not another alcohol
-                                common_alcohols = {'vodka', 'gin', 'rum', 'whiskey', 'tequila', 'bourbon', 'scotch', 'wine', 'beer', 'champagne', 'cognac', 'brandy', 'vermouth'}
-                                if ing_lower not in alcohols and ing_lower not in common_alcohols:
-                                    compatible_mixers.add(ing.lower().strip())
+                    # Requests are paced by the shared rate limiter in app/cocktails.py
+                    drink = fetch_drink(drink_id)
+                    if drink:
+                        compatible_mixers |= mixers_from_drinks([drink], alcohols)
                     else:
                         # If detail fetch failed (likely rate limited), count it
                         rate_limited_count += 1
 
-                    # Small delay to be more API-friendly
-                    time.sleep(0.2)
-
         # Stop if we've exceeded total call limit
         if total_api_calls > 25:
             break
@@ -280,6 +381,11 @@ def compatible_mixers():
 
     return jsonify(response)
 
+@home_routes.route("/cache_stats")
+def cache_stats_view():
+    from flask import jsonify
+    return jsonify({**cache_stats(), **recommendation_results.stats()})
+
 @home_routes.route("/about")
 def about():
     print("ABOUT...")